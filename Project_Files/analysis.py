@@ -0,0 +1,551 @@
+# ============================================
+# AutoSage - Vehicle Analysis Pipeline
+# ============================================
+# Prompts and the cache -> model -> cache flow behind both features,
+# independent of Streamlit so the app and headless callers share it.
+# The pipeline is asyncio-native and runs on the async_client runtime
+# loop; the plain functions are blocking wrappers for synchronous code.
+# SQLite lookups (specs store, catalog) run in worker threads so they do
+# not stall other requests on the loop.
+
+import asyncio
+import json
+import os
+import threading
+
+import analysis_parser
+import async_client
+import catalog
+import comparison
+import intent
+import name_resolver
+import response_cache
+import routing
+import semantic_cache
+import specs_kb
+import vehicle_report
+from vehicle_report import VehicleReport
+
+router = routing.router
+
+
+# ============================================
+# 1️⃣ Write Prompt For Gemini Model (Image Based)
+# ============================================
+
+image_prompt = """
+You are an automobile expert tasked with providing a detailed overview of any vehicles.
+
+FORMATTING RULES:
+- Follow the structure exactly as written below.
+- Each section must be on a new line.
+- Do NOT combine multiple fields in one sentence.
+- Use bullet points properly (one point per line).
+- If unsure, mention (Estimated).
+- Keep the output crisp, practical, and structured.
+
+The information should be presented in a structured format as follows:
+
+Brand: Name of the vehicle brand.
+
+Model: Specific model of the vehicle.
+
+Launch Year: Since when the Vehicle is available in market.
+
+Vehicle Type: (Scooter / Motorcycle / Sedan / SUV / Hatchback / Electric / Hybrid)
+
+Fuel Type: (Petrol / Diesel / Electric / Hybrid)
+
+Key Features:
+- Engine Capacity:
+- Transmission Type:
+- Top 3 Special Features:
+
+Mileage: Provide the average mileage in km/l (or km/charge for EVs).
+
+Performance:
+- Power Output (if known):
+- Torque (if known):
+
+Average Price in INR: Mention the price range of the vehicle model.
+
+Maintenance Level: (Low / Moderate / High)
+
+Safety Features:
+- ABS / Airbags / Stability Control / etc. (if applicable)
+
+Other Details:
+- Maintenance cost (approx):
+- Unique selling points:
+- Target audience:
+
+Approximate Resale Value: Estimate the resale value of the vehicle after 10 years in Indian Rupees.
+
+End with a short 2-line summary of the vehicle's overall positioning in the Indian market.
+"""
+
+# When the specs store knows the vehicle, the model only names it and
+# writes the open-ended parts; the specs come from specs_kb
+identify_prompt = """
+You are an automobile expert. Identify the vehicle in the image for the Indian market.
+
+Answer in exactly this format, one field per line:
+
+Brand: Name of the vehicle brand.
+Model: Specific model of the vehicle.
+Unique selling points: One line.
+Target audience: One line.
+Summary: A short 2-line summary of the vehicle's overall positioning in the Indian market.
+"""
+
+
+# ============================================
+# 2️⃣ Image Analysis Response
+# ============================================
+
+def normalize_vehicle(report):
+    """Rename brand and model to the catalog's; the name_resolver Match or None.
+
+    Only exact names and aliases count: a near miss is often another
+    variant ("Nexon EV" vs "Nexon"), whose specs must not be served or
+    overwritten.
+    """
+    if not (report.brand or report.model):
+        return None
+    match = name_resolver.resolve(f"{report.brand} {report.model}", fuzzy=False)
+    if match is not None:
+        report.brand, report.model = match.brand, match.model
+    return match
+
+
+def learn_specs(parsed):
+    # Under the catalog's name, so "Maruti Vitara Brezza" and "Maruti
+    # Suzuki Vitara Brezza" don't become two vehicles
+    normalize_vehicle(parsed.report)
+    return specs_kb.learn(parsed)
+
+
+# The identification call only pays off when it usually finds the vehicle:
+# a miss costs it on top of the full analysis. It is skipped while recent
+# identifications mostly missed, except for every IDENTIFY_PROBE_EVERY-th
+# image, which notices when the store has caught up.
+IDENTIFY_MIN_HIT_RATE = float(os.getenv("AUTOSAGE_IDENTIFY_MIN_HIT_RATE", "0.5"))
+IDENTIFY_PROBE_EVERY = 10
+_identify_stats = {"hit_rate": IDENTIFY_MIN_HIT_RATE, "skipped": 0}
+_identify_lock = threading.Lock()
+
+
+def _should_identify():
+    with _identify_lock:
+        if _identify_stats["hit_rate"] >= IDENTIFY_MIN_HIT_RATE:
+            return True
+        _identify_stats["skipped"] += 1
+        if _identify_stats["skipped"] < IDENTIFY_PROBE_EVERY:
+            return False
+        _identify_stats["skipped"] = 0
+        return True
+
+
+def _record_identify(hit):
+    # Moving average over roughly the last five identifications
+    with _identify_lock:
+        _identify_stats["hit_rate"] += 0.2 * (hit - _identify_stats["hit_rate"])
+
+
+def _known_report(identified):
+    match = normalize_vehicle(identified)
+    return specs_kb.report(match.key) if match else None
+
+
+def _learn_report(report):
+    # Renames the report itself too, so callers show the catalog's name
+    normalize_vehicle(report)
+    learn_specs(analysis_parser.normalize_report(report))
+
+
+async def report_from_specs(image_data):
+    """A VehicleReport filled from the specs store, or None if not known.
+
+    Costs one short identification call, made only while it tends to hit.
+    """
+    if not specs_kb.ENABLED or await asyncio.to_thread(specs_kb.is_empty):
+        return None
+    if not _should_identify():
+        return None
+    text = await router.agenerate("image_identify", [identify_prompt, image_data])
+    identified = analysis_parser.parse_analysis(text).report
+    report = await asyncio.to_thread(_known_report, identified)
+    _record_identify(report is not None)
+    if report is None:
+        return None
+    for name in specs_kb.OPEN_FIELDS:
+        setattr(report, name, getattr(identified, name))
+    return report
+
+
+async def get_image_response_async(image_data):
+    key, fingerprint, cached = response_cache.get_image_result(
+        image_data["data"], image_prompt, router.cache_id()
+    )
+    if cached is not None:
+        return cached
+
+    report = await report_from_specs(image_data)
+    if report is not None:
+        response = report.to_markdown()
+    else:
+        response = await router.agenerate("image", [image_prompt, image_data])
+        await asyncio.to_thread(learn_specs, analysis_parser.parse_analysis(response))
+    response_cache.put_image_result(
+        key, fingerprint, response, image_prompt, router.cache_id()
+    )
+    return response
+
+
+async def stream_image_response_async(image_data):
+    key, fingerprint, cached = response_cache.get_image_result(
+        image_data["data"], image_prompt, router.cache_id()
+    )
+    if cached is not None:
+        yield cached
+        return
+
+    report = await report_from_specs(image_data)
+    if report is not None:
+        response = report.to_markdown()
+        yield response
+    else:
+        chunks = []
+        async for chunk in router.astream("image", [image_prompt, image_data]):
+            if chunk is routing.RESTART:
+                # Escalated to a higher tier; the new answer replaces the old
+                chunks.clear()
+            else:
+                chunks.append(chunk)
+            yield chunk
+        response = "".join(chunks)
+        await asyncio.to_thread(learn_specs, analysis_parser.parse_analysis(response))
+    # Only complete analyses are cached
+    response_cache.put_image_result(
+        key, fingerprint, response, image_prompt, router.cache_id()
+    )
+
+
+def get_image_response(image_data):
+    return async_client.run(get_image_response_async(image_data))
+
+
+def stream_image_response(image_data):
+    return async_client.iterate(stream_image_response_async(image_data))
+
+
+def get_degraded_image_response(image_data):
+    # Used while the circuit breaker sheds model calls: accept a looser
+    # near-duplicate match rather than nothing. None if there is none.
+    return response_cache.get_image_result(
+        image_data["data"],
+        image_prompt,
+        router.cache_id(),
+        max_distance=response_cache.DEGRADED_PHASH_MAX_DISTANCE,
+    )[2]
+
+
+# Columns of the batch summary table, as named in image_prompt
+SUMMARY_FIELDS = [
+    "Brand",
+    "Model",
+    "Vehicle Type",
+    "Fuel Type",
+    "Mileage",
+    "Average Price in INR",
+]
+
+
+def summarize_analysis(text):
+    report = analysis_parser.parse_analysis(text).report
+    normalize_vehicle(report)
+    return report.summary_row()
+
+
+# ============================================
+# 3️⃣ Structured Vehicle Report (JSON Output)
+# ============================================
+
+# The same sections as image_prompt, requested as JSON that follows
+# vehicle_report.REPORT_SCHEMA (enforced by the model's response_schema).
+report_prompt = """
+You are an automobile expert tasked with providing a detailed overview of the vehicle in the image.
+
+Fill in every field of the JSON response for this vehicle, focused on the Indian market:
+- Keep each value crisp and practical; one fact per list item.
+- special_features: the top 3 special features.
+- mileage: average mileage in km/l (or km/charge for EVs).
+- price_range_inr and resale_value_inr (after 10 years): amounts in Indian Rupees.
+- maintenance_level: Low / Moderate / High.
+- summary: a short 2-line summary of the vehicle's positioning in the Indian market.
+- If unsure of a value, give your best estimate and mark it (Estimated).
+"""
+
+# Reports are cached apart from markdown analyses, per prompt and schema
+_REPORT_CACHE_PROMPT = report_prompt + json.dumps(vehicle_report.REPORT_SCHEMA)
+
+
+async def get_image_report_async(image_data):
+    """The analysis as a VehicleReport (structured-output mode)."""
+    key, fingerprint, cached = response_cache.get_image_result(
+        image_data["data"], _REPORT_CACHE_PROMPT, router.cache_id()
+    )
+    if cached is not None:
+        return VehicleReport.from_json(cached)
+
+    report = await report_from_specs(image_data)
+    if report is None:
+        text = await router.agenerate("image_report", [report_prompt, image_data])
+        try:
+            report = VehicleReport.from_json(text)
+        except ValueError:
+            # Not JSON even from the top tier: show it as-is, but don't cache it
+            return VehicleReport(summary=text)
+        await asyncio.to_thread(_learn_report, report)
+    response_cache.put_image_result(
+        key, fingerprint, report.to_json(), _REPORT_CACHE_PROMPT, router.cache_id()
+    )
+    return report
+
+
+def get_image_report(image_data):
+    return async_client.run(get_image_report_async(image_data))
+
+
+def get_degraded_image_report(image_data):
+    cached = response_cache.get_image_result(
+        image_data["data"],
+        _REPORT_CACHE_PROMPT,
+        router.cache_id(),
+        max_distance=response_cache.DEGRADED_PHASH_MAX_DISTANCE,
+    )[2]
+    return None if cached is None else VehicleReport.from_json(cached)
+
+
+# ============================================
+# 4️⃣ Chat Assistant Prompt
+# ============================================
+
+
+# Prompt for chat assistant. The full template lists the answer layout for
+# every kind of question; with a classified intent only that one is sent.
+_CHAT_HEADER = """
+You are AutoSage, an expert AI automotive advisor focused on the Indian automobile market.
+
+Your role:
+Provide clear, structured, and practical vehicle insights to help users make informed decisions.
+
+FORMATTING RULES:
+- Keep responses crisp and easy to scan.
+- Use bullet points where helpful.
+- Do NOT write long paragraphs.
+- Provide realistic price and mileage ranges.
+- If uncertain, provide approximate values.
+- Focus on decision-making insights.
+
+User Query:
+{user_query}
+
+----------------------------------------
+RESPONSE STRUCTURE ({scope})
+----------------------------------------
+
+"""
+
+# intent -> (title, response layout)
+CHAT_SECTIONS = {
+    intent.BUYING: ("Buying / Recommendation", """Recommended Models (2-4 options):
+- Model Name - Price Range (INR)
+
+For each model include:
+- Mileage:
+- Key Features (Top 3):
+- Best For:
+
+Short Verdict: Which option is better and why."""),
+    intent.COMPARISON: ("Comparison", """Comparison Overview:
+- Price Difference:
+- Mileage Difference:
+- Feature Highlights:
+- Pros & Cons (each model)
+
+Recommendation: Which one to choose and for what type of buyer."""),
+    intent.MAINTENANCE: ("Maintenance", """Maintenance Advice:
+- Key Checks:
+- Seasonal Tips (if relevant):
+- Estimated Service Cost Level:"""),
+    intent.ECO: ("Eco-Friendly Vehicles", """Recommended EV/Hybrid Options:
+- Model - Price - Range (km/charge)
+
+Include:
+- Charging Time:
+- Running Cost Benefit:
+- Government Incentives (India context if applicable)"""),
+}
+
+_SECTION_RULE = "\n\n----------------------------------------\n\n"
+_CHAT_FOOTER = "\n\nEnd every response with a short 2-3 line practical summary.\n"
+
+
+def build_prompt(user_query, intent_name=None):
+    """Chat prompt; with an intent, only that intent's response layout."""
+    if intent_name is None:
+        scope = "Use as applicable"
+        body = _SECTION_RULE.join(
+            f"If the query is about {title}:\n\n{layout}"
+            for title, layout in CHAT_SECTIONS.values()
+        )
+    else:
+        scope, body = CHAT_SECTIONS[intent_name]
+    return _CHAT_HEADER.format(user_query=user_query, scope=scope) + body + _CHAT_FOOTER
+
+
+def chat_prompt(user_query):
+    """Compact prompt for the query's intent plus verified catalog facts."""
+    prompt = build_prompt(user_query, intent.classify(user_query))
+    mentioned = [
+        specs_kb.get(match.key) for match in name_resolver.find_mentions(user_query)
+    ]
+    mentioned = [row for row in mentioned if row is not None]
+    if mentioned:
+        prompt += catalog.mentions_context(mentioned)
+    rows = catalog.recommend(user_query)
+    return prompt + catalog.prompt_context(rows) if rows else prompt
+
+
+# Advertised in the chat panel, and warmed into the cache at startup
+EXAMPLE_QUERIES = [
+    "Best bikes under 2 lakhs",
+    "Compare Nexon and Brezza",
+    "Winter car maintenance tips",
+    "Best electric cars under 20 lakhs",
+]
+
+
+# ============================================
+# 5️⃣ Chat Assistant Response
+# ============================================
+
+# Answers are cached per normalized query and shared across sessions;
+# build_prompt("") stands in for the template version. Paraphrases
+# that miss the exact cache can still hit the semantic cache.
+def get_cached_chat_response(user_query):
+    # Keyed with vehicle names resolved, so "brezza mileage" and "maruti
+    # vitara brezza mileage" share an answer
+    key = response_cache.chat_key(
+        name_resolver.canonical_query(user_query), build_prompt(""), router.cache_id()
+    )
+    cached = response_cache.chat_results.get(key)
+    if cached is None:
+        cached = semantic_cache.lookup(
+            user_query, build_prompt(""), router.cache_id()
+        )
+    return key, cached
+
+
+def store_chat_response(user_query, key, response):
+    response_cache.chat_results.set(key, response)
+    semantic_cache.store(
+        user_query, response, build_prompt(""), router.cache_id()
+    )
+
+
+def _chat_plan(user_query):
+    # (route, prompt, prefix): a comparison of known vehicles starts with
+    # the locally built table and asks the model only for pros and cons
+    local = comparison.compare(user_query)
+    if local is not None:
+        return (
+            "chat_compare",
+            comparison.build_prompt(user_query, local),
+            local.table + "\n\n",
+        )
+    return routing.chat_route(user_query), chat_prompt(user_query), ""
+
+
+async def get_chat_response_async(user_query):
+    key, cached = get_cached_chat_response(user_query)
+    if cached is not None:
+        return cached
+
+    route, prompt, prefix = await asyncio.to_thread(_chat_plan, user_query)
+    response = prefix + await router.agenerate(route, prompt)
+    store_chat_response(user_query, key, response)
+    return response
+
+
+async def stream_chat_response_async(user_query):
+    key, cached = get_cached_chat_response(user_query)
+    if cached is not None:
+        yield cached
+        return
+
+    route, prompt, prefix = await asyncio.to_thread(_chat_plan, user_query)
+    if prefix:
+        yield prefix
+    chunks = []
+    async for chunk in router.astream(route, prompt):
+        if chunk is routing.RESTART:
+            chunks.clear()
+            yield chunk
+            # Consumers drop everything on a restart, the table included
+            if prefix:
+                yield prefix
+            continue
+        chunks.append(chunk)
+        yield chunk
+    store_chat_response(user_query, key, prefix + "".join(chunks))
+
+
+def get_chat_response(user_query):
+    return async_client.run(get_chat_response_async(user_query))
+
+
+def stream_chat_response(user_query):
+    return async_client.iterate(stream_chat_response_async(user_query))
+
+
+def get_degraded_chat_response(user_query):
+    # Used while the circuit breaker sheds model calls; a comparison
+    # table or catalog shortlist beats nothing
+    cached = semantic_cache.lookup(
+        user_query,
+        build_prompt(""),
+        router.cache_id(),
+        threshold=semantic_cache.DEGRADED_THRESHOLD,
+    )
+    if cached is None:
+        local = comparison.compare(user_query)
+        if local is not None:
+            return local.table
+        rows = catalog.recommend(user_query)
+        cached = catalog.format_shortlist(rows) if rows else None
+    return cached
+
+
+# ============================================
+# 6️⃣ Concurrent Fan-Out
+# ============================================
+
+async def analyze_images_async(images, limit=4, timeout=None, structured=False):
+    """Yield (index, analysis_or_exception) for each image as it finishes.
+
+    With structured=True each analysis is a VehicleReport.
+    """
+    fn = get_image_report_async if structured else get_image_response_async
+    async for result in async_client.map_as_completed(
+        fn, images, limit=limit, timeout=timeout
+    ):
+        yield result
+
+
+def analyze_images(images, limit=4, timeout=None, structured=False):
+    """Blocking analyze_images_async(): yields results as they finish."""
+    return async_client.iterate(
+        analyze_images_async(images, limit, timeout, structured)
+    )
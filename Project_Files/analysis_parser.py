@@ -0,0 +1,400 @@
+# ============================================
+# AutoSage - Markdown Analysis Parser
+# ============================================
+# Most cached and historical analyses are the free-text layout that
+# image_prompt asks for. parse_analysis() reads one in a single pass over
+# its lines into the same fields as a VehicleReport, then normalizes the
+# numbers worth querying: INR price and resale ranges as rupee min/max,
+# mileage as min/max plus unit (km/l, km/charge, km/kg) and engine cc.
+# It tolerates the usual drift in model output (markdown decoration,
+# numbered sections, renamed sections, values on the next line) and
+# scores how complete the analysis is, so a dataset can be backfilled
+# from old outputs without calling the model again:
+#
+#   python analysis_parser.py results.jsonl -o dataset.parquet
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+from vehicle_report import VehicleReport
+
+# ============================================
+# 1️⃣ Section Labels
+# ============================================
+
+# Field -> labels seen in model output; None marks grouping headers
+# ("Key Features:") whose bullets carry their own labels
+_ALIASES = {
+    "brand": ["Brand", "Make", "Manufacturer"],
+    "model": ["Model", "Model Name"],
+    "launch_year": ["Launch Year", "Year of Launch", "Launched", "Launch"],
+    "vehicle_type": ["Vehicle Type", "Body Type", "Type", "Segment"],
+    "fuel_type": ["Fuel Type", "Fuel"],
+    "engine_capacity": ["Engine Capacity", "Engine", "Displacement"],
+    "transmission": ["Transmission Type", "Transmission", "Gearbox"],
+    "special_features": ["Top 3 Special Features", "Special Features", "Top Features"],
+    "mileage": ["Mileage", "Average Mileage", "Fuel Efficiency", "Range"],
+    "power_output": ["Power Output", "Max Power", "Power"],
+    "torque": ["Torque", "Max Torque"],
+    "price_range_inr": [
+        "Average Price in INR",
+        "Average Price",
+        "Price Range",
+        "Ex-Showroom Price",
+        "Price",
+    ],
+    "maintenance_level": ["Maintenance Level"],
+    "safety_features": ["Safety Features", "Safety"],
+    "maintenance_cost": ["Maintenance cost", "Maintenance"],
+    "unique_selling_points": ["Unique selling points", "USPs", "USP"],
+    "target_audience": ["Target audience", "Ideal For", "Best For"],
+    "resale_value_inr": [
+        "Approximate Resale Value",
+        "Expected Resale Value",
+        "Resale Value",
+    ],
+    "summary": ["Summary", "Verdict"],
+    None: ["Key Features", "Performance", "Other Details"],
+}
+
+_LABELS = {
+    label.casefold(): field for field, labels in _ALIASES.items() for label in labels
+}
+# "**Brand:** Tata", "1. ### Launch Year: 2019", "- Torque (if known): 170 Nm";
+# the label is looked up in _LABELS, so unknown "X: y" lines stay content
+_SECTION_RE = re.compile(
+    r"^(?:\d{1,2}[.)]|[\s>#*_•-])*"
+    r"(?P<label>[A-Za-z][\w -]{0,40}?)"
+    r"\s*(?:\([^)]*\))?[\s*_]*[:：][\s*_]*(?P<value>.*?)[\s*_]*$"
+)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d{1,2}[.)])\s+")
+
+_LIST_FIELDS = {
+    field.name for field in fields(VehicleReport) if field.type is tuple
+}
+# The sections image_prompt requires; used for the validation score
+REQUIRED = (
+    "brand",
+    "model",
+    "launch_year",
+    "vehicle_type",
+    "fuel_type",
+    "key_features",
+    "mileage",
+    "price_range_inr",
+    "safety_features",
+)
+_KEY_FEATURES = ("engine_capacity", "transmission", "special_features")
+
+
+# ============================================
+# 2️⃣ Unit Normalization
+# ============================================
+
+_MULTIPLIERS = {
+    "thousand": 1_000,
+    "k": 1_000,
+    "lakh": 100_000,
+    "lakhs": 100_000,
+    "lac": 100_000,
+    "lacs": 100_000,
+    "l": 100_000,
+    "crore": 10_000_000,
+    "crores": 10_000_000,
+    "cr": 10_000_000,
+}
+_UNIT = r"thousand|k|lakhs?|lacs?|l|crores?|cr"
+_INR_AMOUNT_RE = re.compile(
+    rf"(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>{_UNIT})?\b", re.IGNORECASE
+)
+# "(in lakhs)", "₹ lakh": a unit stated once for the whole value
+_INR_UNIT_RE = re.compile(rf"\b(?P<unit>{_UNIT})\b", re.IGNORECASE)
+_YEARS_RE = re.compile(r"\b(?:after\s+)?\d{1,2}\s*(?:years?|yrs?)\b", re.IGNORECASE)
+# "(ex-showroom, 2024)", "(approx, 2023 prices)": notes, not amounts
+_NOTE_RE = re.compile(r"\([^)]*\)")
+_CALENDAR_YEAR_RE = re.compile(
+    rf"(?<![₹\d,.])\b(?:19|20)\d\d\b(?![\d,.]|\s*(?:{_UNIT})\b)", re.IGNORECASE
+)
+# A "range" wider than this is several unrelated figures, not one price
+_MAX_RANGE_RATIO = 50
+
+# "1,200" as well as "1200"
+_NUMBER = r"(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?"
+_MILEAGE_RE = re.compile(
+    rf"(?P<low>{_NUMBER})\s*(?:(?:-|–|—|to)\s*(?P<high>{_NUMBER})\s*)?"
+    r"(?P<unit>km\s*/\s*(?:l|ltr|litre|liter)\b|kmpl|km\s*/\s*kg|km\s*/\s*charge"
+    r"|km\s+per\s+(?:l|litre|liter|kg|charge)\b|km\b)",
+    re.IGNORECASE,
+)
+_CC_RE = re.compile(
+    r"(?P<cc>\d{1,2},\d{3}|\d{2,4}(?:\.\d+)?)\s*(?:cc|cm3|cm³)\b", re.IGNORECASE
+)
+_LITRE_RE = re.compile(
+    r"(?P<litres>\d(?:\.\d)?)\s*(?:-\s*)?(?:l|litre|liter)\b", re.IGNORECASE
+)
+
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+
+def parse_inr_range(text):
+    """(min, max) rupees in e.g. "₹8–10 lakh"; (None, None) if no amount.
+
+    A small bare number takes the unit of the amount after it ("8-10
+    lakh"), then any unit stated once ("8 - 10 (in lakhs)"), then lakh,
+    the usual unit for vehicle prices; a bare number of 1000 or more is
+    already in rupees ("₹79,000 – ₹1.05 lakh"). Years and parenthesised
+    notes are ignored, and figures that cannot be one range give
+    (None, None).
+    """
+    text = _YEARS_RE.sub(" ", text)
+    stated = _INR_UNIT_RE.search(text)
+    default_unit = stated.group("unit") if stated else None
+    text = _CALENDAR_YEAR_RE.sub(" ", _NOTE_RE.sub(" ", text))
+    amounts = [
+        (_number(m.group("number")), m.group("unit"))
+        for m in _INR_AMOUNT_RE.finditer(text)
+    ]
+    if not amounts:
+        return None, None
+    values = []
+    next_unit = None
+    for value, unit in reversed(amounts):
+        if unit is None and value < 1000:
+            unit = next_unit or default_unit or "lakh"
+        next_unit = unit
+        values.append(value * _MULTIPLIERS.get(unit.lower() if unit else "", 1))
+    values.reverse()
+    low, high = min(values), max(values)
+    if values[0] > values[-1] or not low or high > low * _MAX_RANGE_RATIO:
+        return None, None
+    return round(low), round(high)
+
+
+def parse_mileage(text):
+    """(min, max, unit) from e.g. "17-20 km/l"; unit is km/l, km/kg or km/charge."""
+    match = _MILEAGE_RE.search(text)
+    if match is None:
+        return None, None, None
+    unit = match.group("unit").lower().replace(" ", "")
+    if unit.endswith("charge"):
+        unit = "km/charge"
+    elif unit.endswith("kg"):
+        unit = "km/kg"
+    elif unit == "km":
+        # A bare "km" is an EV range
+        unit = "km/charge"
+    else:
+        unit = "km/l"
+    low = _number(match.group("low"))
+    high = _number(match.group("high")) if match.group("high") else low
+    return min(low, high), max(low, high), unit
+
+
+def parse_engine_cc(text):
+    """Engine displacement in cc from e.g. "1199 cc" or "1.5L"; None if absent."""
+    match = _CC_RE.search(text)
+    if match:
+        return round(_number(match.group("cc")))
+    match = _LITRE_RE.search(text)
+    if match:
+        return round(float(match.group("litres")) * 1000)
+    return None
+
+
+# ============================================
+# 3️⃣ Single-Pass Parser
+# ============================================
+
+@dataclass(slots=True)
+class ParsedAnalysis:
+    report: VehicleReport
+    price_min_inr: int = None
+    price_max_inr: int = None
+    resale_min_inr: int = None
+    resale_max_inr: int = None
+    mileage_min: float = None
+    mileage_max: float = None
+    mileage_unit: str = None
+    engine_cc: int = None
+    score: float = 0.0
+    missing: tuple = ()
+
+    def numbers(self):
+        """The normalized values and score, e.g. for extra dataset columns."""
+        return {
+            field.name: getattr(self, field.name)
+            for field in fields(self)
+            if field.name not in ("report", "missing")
+        }
+
+    def to_row(self):
+        """Flat dict of the report fields and normalized values."""
+        row = {
+            name: "; ".join(value) if isinstance(value, tuple) else value
+            for name, value in self.report.to_dict().items()
+        }
+        row.update(self.numbers())
+        row["missing"] = ", ".join(self.missing)
+        return row
+
+
+def _split_list(value):
+    return [part.strip() for part in re.split(r"[,;]", value) if part.strip()]
+
+
+def parse_analysis(text):
+    """Parse one image_prompt-style analysis; never raises on odd input."""
+    values = {}
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        # Cheap test first: most lines are bullets without a label
+        has_colon = ":" in stripped or "：" in stripped
+        match = _SECTION_RE.match(stripped) if has_colon else None
+        label = match and match.group("label").casefold()
+        if label in _LABELS:
+            field = _LABELS[label]
+            value = match.group("value")
+            if field is None or field in values:
+                # A grouping header, or a repeated label inside another
+                # section ("- Price: ..." under Other Details)
+                if field is None:
+                    current = None
+                    continue
+                if current is not None:
+                    values[current].append(stripped)
+                continue
+            current = field
+            values[field] = _split_list(value) if field in _LIST_FIELDS else [value]
+            continue
+        if current is None:
+            continue
+        item = _BULLET_RE.sub("", stripped).strip("*_ ")
+        if not item:
+            continue
+        bullet = _BULLET_RE.match(stripped)
+        if current == "resale_value_inr" and values[current][-1] and not bullet:
+            # The closing summary follows the last section unlabeled
+            current = "summary"
+            values.setdefault("summary", [])
+        values[current].append(item)
+
+    report = VehicleReport.from_dict(
+        {
+            field: (
+                tuple(v for v in parts if v)
+                if field in _LIST_FIELDS
+                else " ".join(v for v in parts if v)
+            )
+            for field, parts in values.items()
+        }
+    )
+    return normalize_report(report)
+
+
+def normalize_report(report):
+    """Normalized values and score for a VehicleReport, however obtained."""
+    parsed = ParsedAnalysis(report)
+    parsed.price_min_inr, parsed.price_max_inr = parse_inr_range(report.price_range_inr)
+    parsed.resale_min_inr, parsed.resale_max_inr = parse_inr_range(
+        report.resale_value_inr
+    )
+    parsed.mileage_min, parsed.mileage_max, parsed.mileage_unit = parse_mileage(
+        report.mileage
+    )
+    parsed.engine_cc = parse_engine_cc(report.engine_capacity)
+
+    missing = []
+    for name in REQUIRED:
+        if name == "key_features":
+            present = any(getattr(report, key) for key in _KEY_FEATURES)
+        else:
+            present = bool(getattr(report, name))
+        if not present:
+            missing.append(name)
+    parsed.missing = tuple(missing)
+
+    # Mostly section coverage, plus whether the key numbers were usable
+    electric = "electric" in report.fuel_type.lower()
+    parsed.score = round(
+        0.7 * (1 - len(missing) / len(REQUIRED))
+        + 0.15 * (parsed.price_min_inr is not None)
+        + 0.1 * (parsed.mileage_min is not None)
+        + 0.05 * (parsed.engine_cc is not None or electric),
+        3,
+    )
+    return parsed
+
+
+# ============================================
+# 4️⃣ Backfill From Stored Analyses
+# ============================================
+
+def read_rows(path):
+    """Rows of a .jsonl, .csv or .parquet file, as dicts."""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        import pandas as pd
+
+        frame = pd.read_csv(path) if path.suffix == ".csv" else pd.read_parquet(path)
+        yield from frame.to_dict("records")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Parse stored markdown analyses into a queryable dataset."
+    )
+    parser.add_argument(
+        "source", help=".jsonl, .csv or .parquet with an 'analysis' column"
+    )
+    parser.add_argument(
+        "-o", "--output", required=True, help="dataset file (.jsonl, .csv, .parquet)"
+    )
+    parser.add_argument(
+        "--min-score", type=float, default=0.0, help="drop rows scoring below this"
+    )
+    args = parser.parse_args(argv)
+
+    rows = []
+    for source_row in read_rows(args.source):
+        text = source_row.get("analysis")
+        if not isinstance(text, str) or not text:
+            continue
+        parsed = parse_analysis(text)
+        if parsed.score < args.min_score:
+            continue
+        keep = {k: source_row[k] for k in ("file", "sha256") if k in source_row}
+        rows.append({**keep, **parsed.to_row()})
+
+    output = Path(args.output)
+    if output.suffix == ".jsonl":
+        with output.open("w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    else:
+        import pandas as pd
+
+        frame = pd.DataFrame(rows)
+        if output.suffix == ".csv":
+            frame.to_csv(output, index=False)
+        else:
+            frame.to_parquet(output, index=False)
+    print(f"Parsed {len(rows)} analyses into {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# ============================================
+# AutoSage - Client For The Inference Service
+# ============================================
+# Same function names and behaviour as analysis.py, but every call goes
+# to service.py over HTTP. The Streamlit app switches to this module when
+# AUTOSAGE_API_URL is set, so UI servers stay thin and the inference tier
+# scales separately. Service errors are mapped back to the exceptions the
+# app already handles: CircuitOpenError while the model is being shed,
+# ConnectionError (one of retry.MODEL_ERRORS) for everything else.
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import rate_limit
+import routing
+from circuit_breaker import CircuitOpenError
+from vehicle_report import VehicleReport
+
+API_URL = os.getenv("AUTOSAGE_API_URL", "").rstrip("/")
+# Generous read timeout: the service runs its own retries within a deadline
+TIMEOUT = (5, float(os.getenv("AUTOSAGE_API_TIMEOUT", "120")))
+
+_session = requests.Session()
+
+
+# ============================================
+# 1️⃣ Transport
+# ============================================
+
+def _raise_for_error(body):
+    if body.get("error") == "circuit_open":
+        raise CircuitOpenError(body.get("retry_in", 0))
+    raise ConnectionError(f"AutoSage service error: {body.get('error')}")
+
+
+def _post(
+    path, stream=True, degraded=False, structured=False, timeout=TIMEOUT, **kwargs
+):
+    params = {
+        "stream": int(stream),
+        "degraded": int(degraded),
+        "structured": int(structured),
+    }
+    headers = {rate_limit.SESSION_HEADER: rate_limit.current_session.get()}
+    try:
+        response = _session.post(
+            f"{API_URL}{path}",
+            params=params,
+            headers=headers,
+            stream=stream,
+            timeout=timeout,
+            **kwargs,
+        )
+    except requests.RequestException as exc:
+        raise ConnectionError(f"AutoSage service unreachable: {exc}") from exc
+    if response.status_code == 404 and degraded:
+        return None
+    if response.status_code >= 400:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"error": f"HTTP {response.status_code}"}
+        _raise_for_error(body)
+    return response
+
+
+def _events(response):
+    # NDJSON stream from the service -> text chunks and routing.RESTART
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            event = json.loads(line)
+            if "chunk" in event:
+                yield event["chunk"]
+            elif event.get("restart"):
+                yield routing.RESTART
+            else:
+                _raise_for_error(event)
+    except requests.RequestException as exc:
+        raise ConnectionError(f"AutoSage service stream broke: {exc}") from exc
+    finally:
+        response.close()
+
+
+def _image_files(image_data):
+    return {"image": ("image", image_data["data"], image_data["mime_type"])}
+
+
+# ============================================
+# 2️⃣ Image Analysis
+# ============================================
+
+def _analyze(image_data, structured=False, timeout=None):
+    # A non-streamed /analyze sends nothing until the answer is ready, so
+    # the read timeout bounds the whole call
+    response = _post(
+        "/analyze",
+        stream=False,
+        structured=structured,
+        timeout=TIMEOUT if timeout is None else (TIMEOUT[0], timeout),
+        files=_image_files(image_data),
+    )
+    if structured:
+        return VehicleReport.from_dict(response.json()["report"])
+    return response.json()["analysis"]
+
+
+def get_image_response(image_data):
+    return _analyze(image_data)
+
+
+def stream_image_response(image_data):
+    return _events(_post("/analyze", files=_image_files(image_data)))
+
+
+def get_degraded_image_response(image_data):
+    response = _post(
+        "/analyze", stream=False, degraded=True, files=_image_files(image_data)
+    )
+    return None if response is None else response.json()["analysis"]
+
+
+def get_image_report(image_data):
+    return _analyze(image_data, structured=True)
+
+
+def get_degraded_image_report(image_data):
+    response = _post(
+        "/analyze",
+        stream=False,
+        degraded=True,
+        structured=True,
+        files=_image_files(image_data),
+    )
+    if response is None:
+        return None
+    return VehicleReport.from_dict(response.json()["report"])
+
+
+def analyze_images(images, limit=4, timeout=None, structured=False):
+    """Yield (index, analysis_or_exception) for each image as it finishes.
+
+    As in analysis.analyze_images, `timeout` applies to each image's
+    request, not to the whole batch; an image that runs over yields a
+    ConnectionError.
+    """
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        futures = {
+            pool.submit(_analyze, image, structured, timeout): i
+            for i, image in enumerate(images)
+        }
+        try:
+            for future in as_completed(futures):
+                exc = future.exception()
+                yield futures[future], exc if exc is not None else future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+# ============================================
+# 3️⃣ Chat Assistant
+# ============================================
+
+def get_chat_response(user_query):
+    return _post("/chat", stream=False, json={"query": user_query}).json()[
+        "response"
+    ]
+
+
+def stream_chat_response(user_query):
+    return _events(_post("/chat", json={"query": user_query}))
+
+
+def get_degraded_chat_response(user_query):
+    response = _post("/chat", stream=False, degraded=True, json={"query": user_query})
+    return None if response is None else response.json()["response"]
@@ -9,9 +9,22 @@
 
 from dotenv import load_dotenv
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import streamlit as st
-import google.generativeai as genai
-from PIL import Image
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import analysis
+import circuit_breaker
+import image_preprocess
+import jobs
+import model_client
+import rate_limit
+import retry
+import routing
+import vehicle_report
+import warmup
+from vehicle_report import VehicleReport
 
 # Load environment variables
 try:
@@ -23,84 +36,112 @@ except Exception:
     load_dotenv(env_path)
     api_key = os.getenv("GOOGLE_API_KEY")
 
-# Configure Gemini API
-genai.configure(api_key=api_key)
+# Configure Gemini API (once per process, shared by all sessions)
+model_client.configure(api_key)
+
+MODEL_UNAVAILABLE_MESSAGE = (
+    "AutoSage couldn't reach the AI model right now. Please try again shortly."
+)
+DEGRADED_NOTICE = (
+    "AutoSage is under heavy load, so this answer comes from a closely "
+    "matching earlier result and may not be exact."
+)
+
+# Render responses token-by-token as they arrive (set AUTOSAGE_STREAMING=0 to disable)
+STREAM_RESPONSES = os.getenv("AUTOSAGE_STREAMING", "1") != "0"
+
+# How many images of a multi-image upload are analyzed at once
+BATCH_CONCURRENCY = int(os.getenv("AUTOSAGE_BATCH_CONCURRENCY", "8"))
+
+# Run single-image analyses as background jobs (set AUTOSAGE_JOBS=0 to run inline)
+USE_JOBS = os.getenv("AUTOSAGE_JOBS", "1") != "0"
+JOB_POLL_SECONDS = float(os.getenv("AUTOSAGE_JOB_POLL_SECONDS", "1"))
+
+# Ask for JSON that fills a typed VehicleReport instead of free text
+STRUCTURED_OUTPUT = os.getenv("AUTOSAGE_STRUCTURED_OUTPUT", "0") == "1"
 
 # ============================================
 # 2️⃣ Interfacing With Pre-Trained Model
 # ============================================
 
-def load_model():
-    return genai.GenerativeModel("models/gemini-2.5-flash")
+# Each task starts on the cheapest Gemini tier in the ladder and moves up
+# only when the answer fails validation (see routing.py). Models are cached
+# per process, so reruns reuse the warm connection.
+router = routing.router
 
 
 # ============================================
 # 3️⃣ Write Prompt For Gemini Model (Image Based)
 # ============================================
 
-image_prompt = """
-You are an automobile expert tasked with providing a detailed overview of any vehicles.
-
-FORMATTING RULES:
-- Follow the structure exactly as written below.
-- Each section must be on a new line.
-- Do NOT combine multiple fields in one sentence.
-- Use bullet points properly (one point per line).
-- If unsure, mention (Estimated).
-- Keep the output crisp, practical, and structured.
-
-The information should be presented in a structured format as follows:
+# The prompts and the cached, routed response functions live in
+# analysis.py so the headless service and batch tools share them.
+image_prompt = analysis.image_prompt
 
-Brand: Name of the vehicle brand.
 
-Model: Specific model of the vehicle.
-
-Launch Year: Since when the Vehicle is available in market.
-
-Vehicle Type: (Scooter / Motorcycle / Sedan / SUV / Hatchback / Electric / Hybrid)
-
-Fuel Type: (Petrol / Diesel / Electric / Hybrid)
-
-Key Features:
-- Engine Capacity:
-- Transmission Type:
-- Top 3 Special Features:
+# ============================================
+# 4️⃣ Implement Function To Read Image
+# ============================================
 
-Mileage: Provide the average mileage in km/l (or km/charge for EVs).
+# Longest side of the preview sent to the browser
+DISPLAY_MAX_DIM = int(os.getenv("AUTOSAGE_DISPLAY_MAX_DIM", "1024"))
 
-Performance:
-- Power Output (if known):
-- Torque (if known):
 
-Average Price in INR: Mention the price range of the vehicle model.
+# Longest side of the per-image previews in a multi-image upload
+GRID_MAX_DIM = int(os.getenv("AUTOSAGE_GRID_MAX_DIM", "320"))
 
-Maintenance Level: (Low / Moderate / High)
 
-Safety Features:
-- ABS / Airbags / Stability Control / etc. (if applicable)
+def _prepare_upload(uploaded_file):
+    # Upright, downscaled and metadata-free before it goes over the wire
+    image, bytes_data, mime_type = image_preprocess.prepare_image(
+        uploaded_file.getvalue()
+    )
+    return {
+        "file_id": uploaded_file.file_id,
+        "image": image,
+        "thumbnails": {},
+        "image_data": {
+            "mime_type": mime_type,
+            "data": bytes_data
+        },
+    }
+
+
+def get_upload_assets_batch(uploaded_files):
+    # Decode, preprocess and thumbnail each upload once; reruns triggered by
+    # button clicks or text edits reuse the result instead of the raw file.
+    cached = st.session_state.get("upload_assets", {})
+    missing = [f for f in uploaded_files if f.file_id not in cached]
+    if len(missing) > 1:
+        # Pillow releases the GIL while decoding and resizing
+        with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as pool:
+            prepared = list(pool.map(_prepare_upload, missing))
+    else:
+        prepared = [_prepare_upload(f) for f in missing]
+    cached.update((assets["file_id"], assets) for assets in prepared)
+    # Only the current uploads are kept per session
+    st.session_state.upload_assets = {
+        f.file_id: cached[f.file_id] for f in uploaded_files
+    }
+    return [cached[f.file_id] for f in uploaded_files]
 
-Other Details:
-- Maintenance cost (approx):
-- Unique selling points:
-- Target audience:
 
-Approximate Resale Value: Estimate the resale value of the vehicle after 10 years in Indian Rupees.
+def get_upload_assets(uploaded_file):
+    return get_upload_assets_batch([uploaded_file])[0]
 
-End with a short 2-line summary of the vehicle's overall positioning in the Indian market.
-"""
 
+def get_thumbnail(assets, max_dimension=DISPLAY_MAX_DIM):
+    thumbnails = assets["thumbnails"]
+    if max_dimension not in thumbnails:
+        thumbnails[max_dimension] = image_preprocess.make_thumbnail(
+            assets["image"], max_dimension
+        )
+    return thumbnails[max_dimension]
 
-# ============================================
-# 4️⃣ Implement Function To Read Image
-# ============================================
 
 def input_image_setup(uploaded_file):
     if uploaded_file is not None:
-        bytes_data = uploaded_file.getvalue()
-        return {
-            "mime_type": uploaded_file.type,
-            "data": bytes_data
-        }
+        return get_upload_assets(uploaded_file)["image_data"]
     else:
         raise FileNotFoundError("No file uploaded")
 
@@ -109,18 +150,184 @@ def input_image_setup(uploaded_file):
 # 5️⃣ Implement Function To Get Gemini Response
 # ============================================
 
-def get_image_response(image_data):
-    model = load_model()
-    response = model.generate_content([image_prompt, image_data])
-    return response.text
+from analysis import EXAMPLE_QUERIES
+
+# With AUTOSAGE_API_URL set, this app is a thin client of the headless
+# inference service (service.py), which owns the model, caches and
+# warm-up. Otherwise inference runs in-process: async-native underneath
+# (see async_client.py), blocking the script thread only on the result.
+if os.getenv("AUTOSAGE_API_URL"):
+    import api_client as backend
+else:
+    backend = analysis
+
+    # Runs once per process in the background (AUTOSAGE_WARMUP=1 to enable)
+    warmup.start(
+        analysis.get_chat_response,
+        lambda query: analysis.get_cached_chat_response(query)[1] is not None,
+        EXAMPLE_QUERIES,
+    )
+
+if STRUCTURED_OUTPUT:
+    # Whole VehicleReport records instead of streamed markdown
+    get_image_response = backend.get_image_report
+    get_degraded_image_response = backend.get_degraded_image_report
+
+    def stream_image_response(image_data):
+        yield get_image_response(image_data).to_json()
+
+    def get_degraded_job_response(image_data):
+        report = get_degraded_image_response(image_data)
+        return None if report is None else report.to_json()
+else:
+    get_image_response = backend.get_image_response
+    stream_image_response = backend.stream_image_response
+    get_degraded_image_response = backend.get_degraded_image_response
+    get_degraded_job_response = get_degraded_image_response
+analyze_images = backend.analyze_images
+get_chat_response = backend.get_chat_response
+stream_chat_response = backend.stream_chat_response
+get_degraded_chat_response = backend.get_degraded_chat_response
+
+# Worker threads outlive reruns and sessions; started once per process
+if USE_JOBS:
+    jobs.start(
+        stream_image_response, get_degraded_job_response, retry.RETRYABLE_ERRORS
+    )
 
 
 # ============================================
 # 6️⃣ Model Deployment - Streamlit Integration
 # ============================================
 
+def render_stream(chunks):
+    # Like st.write_stream, but a routing.RESTART chunk (the answer is being
+    # redone on a stronger model) clears what has been shown so far.
+    placeholder = st.empty()
+    text = ""
+    for chunk in chunks:
+        if chunk is routing.RESTART:
+            text = ""
+            placeholder.markdown("_Refining the answer with a more capable model..._")
+            continue
+        text += chunk
+        placeholder.markdown(text + "▌")
+    placeholder.markdown(text)
+    return text
+
+
+def render_report(report):
+    # Key facts up top, then the full report, all from the typed fields
+    st.markdown(f"#### {report.brand} {report.model}")
+    for column, name in zip(
+        st.columns(4), ("vehicle_type", "fuel_type", "mileage", "price_range_inr")
+    ):
+        column.metric(vehicle_report.TITLES[name], getattr(report, name) or "—")
+    st.markdown(report.to_markdown())
+
+
+def render_analysis(result):
+    if isinstance(result, VehicleReport):
+        render_report(result)
+    else:
+        st.markdown(result)
+
+
+def _job_result(job):
+    # Structured jobs store the report as JSON
+    if STRUCTURED_OUTPUT:
+        try:
+            return VehicleReport.from_json(job["result"])
+        except ValueError:
+            pass
+    return job["result"]
+
+
+def _render_job(job_id, polling):
+    job = jobs.get(job_id)
+    if job is None:
+        st.warning("That analysis is no longer available. Please upload it again.")
+        return
+    pending = job["status"] in (jobs.QUEUED, jobs.RUNNING)
+    if polling and not pending:
+        # Finished: rerun the page once so polling stops
+        st.rerun()
+
+    st.markdown("### 🚘 Vehicle Analysis")
+    if job["status"] == jobs.FAILED:
+        st.error(MODEL_UNAVAILABLE_MESSAGE)
+    elif pending and job["result"] and not STRUCTURED_OUTPUT:
+        st.markdown(job["result"] + "▌")
+    elif pending:
+        st.info("Analyzing Vehicle... you can keep using the page or come back later.")
+    else:
+        if job["degraded"]:
+            st.warning(DEGRADED_NOTICE)
+        render_analysis(_job_result(job))
+
+
+def show_job(job_id):
+    # The job id lives in the URL, so a reload or dropped connection comes
+    # back to the same analysis. Only this fragment reruns while polling.
+    job = jobs.get(job_id)
+    polling = job is not None and job["status"] in (jobs.QUEUED, jobs.RUNNING)
+    st.fragment(run_every=JOB_POLL_SECONDS if polling else None)(_render_job)(
+        job_id, polling
+    )
+
+
+def analyze_batch(uploaded_files):
+    # Analyze all uploads concurrently and show each result as soon as it
+    # arrives; returns the summary rows in upload order.
+    images = [input_image_setup(f) for f in uploaded_files]
+    rows = [None] * len(images)
+    progress = st.progress(0.0, text=f"Analyzing 0 of {len(images)} vehicles...")
+    for done, (index, result) in enumerate(
+        analyze_images(
+            images, limit=BATCH_CONCURRENCY, structured=STRUCTURED_OUTPUT
+        ),
+        start=1,
+    ):
+        name = uploaded_files[index].name
+        status = "Analyzed"
+        if isinstance(result, circuit_breaker.CircuitOpenError):
+            result = get_degraded_image_response(images[index])
+            status = "From similar image" if result is not None else "Unavailable"
+        elif isinstance(result, Exception):
+            result = None
+            status = "Unavailable"
+
+        with st.expander(f"{index + 1}. {name} — {status}", expanded=done == 1):
+            thumbnail = get_thumbnail(
+                get_upload_assets(uploaded_files[index]), GRID_MAX_DIM
+            )
+            st.image(thumbnail)
+            if result is None:
+                st.error(MODEL_UNAVAILABLE_MESSAGE)
+            else:
+                if status != "Analyzed":
+                    st.warning(DEGRADED_NOTICE)
+                render_analysis(result)
+
+        if isinstance(result, VehicleReport):
+            fields = result.summary_row()
+        else:
+            fields = analysis.summarize_analysis(result or "")
+        rows[index] = {"#": index + 1, "Image": name, **fields, "Status": status}
+        progress.progress(
+            done / len(images), text=f"Analyzing {done} of {len(images)} vehicles..."
+        )
+    progress.empty()
+    return rows
+
+
 st.set_page_config(layout="wide", page_title="AutoSage", page_icon="🚗")
 
+# Model calls from this run queue fairly against other sessions
+_ctx = get_script_run_ctx()
+if _ctx is not None:
+    rate_limit.current_session.set(_ctx.session_id)
+
 # Session State
 if "mode" not in st.session_state:
     st.session_state.mode = "image"
@@ -148,21 +355,67 @@ with col2:
 
 if st.session_state.mode == "image":
 
-    st.markdown("## 📸 Upload Vehicle Image")
+    st.markdown("## 📸 Upload Vehicle Images")
 
-    uploaded_file = st.file_uploader("", type=["jpg", "jpeg", "png"])
+    uploaded_files = st.file_uploader(
+        "", type=["jpg", "jpeg", "png"], accept_multiple_files=True
+    )
 
-    if uploaded_file:
-        image = Image.open(uploaded_file)
-        st.image(image, width="stretch")
-
-        if st.button("Analyze Vehicle", type="primary"):
-            with st.spinner("Analyzing Vehicle..."):
-                image_data = input_image_setup(uploaded_file)
-                result = get_image_response(image_data)
+    if len(uploaded_files) > 1:
+        assets = get_upload_assets_batch(uploaded_files)
+        grid = st.columns(4)
+        for i, (uploaded, item) in enumerate(zip(uploaded_files, assets)):
+            grid[i % 4].image(
+                get_thumbnail(item, GRID_MAX_DIM), caption=uploaded.name
+            )
 
+        if st.button(f"Analyze {len(uploaded_files)} Vehicles", type="primary"):
             st.markdown("### 🚘 Vehicle Analysis")
-            st.markdown(result)
+            rows = analyze_batch(uploaded_files)
+            st.markdown("### 📋 Summary")
+            st.dataframe(rows, hide_index=True, width="stretch")
+
+    elif uploaded_files:
+        uploaded_file = uploaded_files[0]
+        st.image(get_thumbnail(get_upload_assets(uploaded_file)), width="stretch")
+
+        if st.button("Analyze Vehicle", type="primary"):
+            image_data = input_image_setup(uploaded_file)
+            saved = uploaded_file.size - len(image_data["data"])
+            if saved > 0:
+                st.caption(
+                    f"Image optimised for upload: {uploaded_file.size / 1024:,.0f} KB"
+                    f" → {len(image_data['data']) / 1024:,.0f} KB"
+                )
+
+            if USE_JOBS:
+                st.query_params["job"] = jobs.submit(
+                    image_data, rate_limit.current_session.get(), uploaded_file.name
+                )
+            else:
+                try:
+                    if STREAM_RESPONSES and not STRUCTURED_OUTPUT:
+                        st.markdown("### 🚘 Vehicle Analysis")
+                        with st.spinner("Analyzing Vehicle..."):
+                            result = render_stream(stream_image_response(image_data))
+                    else:
+                        with st.spinner("Analyzing Vehicle..."):
+                            result = get_image_response(image_data)
+
+                        st.markdown("### 🚘 Vehicle Analysis")
+                        render_analysis(result)
+                except circuit_breaker.CircuitOpenError:
+                    result = get_degraded_image_response(image_data)
+                    if result is None:
+                        st.error(MODEL_UNAVAILABLE_MESSAGE)
+                    else:
+                        st.warning(DEGRADED_NOTICE)
+                        render_analysis(result)
+                except retry.MODEL_ERRORS:
+                    st.error(MODEL_UNAVAILABLE_MESSAGE)
+
+    if USE_JOBS and "job" in st.query_params:
+        show_job(st.query_params["job"])
 
 
 # ============================================
@@ -189,90 +442,10 @@ elif st.session_state.mode == "chat":
 • Explain specifications in simple terms  
 
 **Try asking queries like:**
-- Best bikes under 2 lakhs  
-- Compare Nexon and Brezza  
-- Winter car maintenance tips  
-- Best electric cars under 20 lakhs  
-""")
+""" + "".join(f"- {query}  \n" for query in EXAMPLE_QUERIES))
 
     st.markdown("---")
 
-    # Prompt for chat assistant (UNCHANGED)
-    def build_prompt(user_query):
-        return f"""
-You are AutoSage, an expert AI automotive advisor focused on the Indian automobile market.
-
-Your role:
-Provide clear, structured, and practical vehicle insights to help users make informed decisions.
-
-FORMATTING RULES:
-- Keep responses crisp and easy to scan.
-- Use bullet points where helpful.
-- Do NOT write long paragraphs.
-- Provide realistic price and mileage ranges.
-- If uncertain, provide approximate values.
-- Focus on decision-making insights.
-
-User Query:
-{user_query}
-
-----------------------------------------
-RESPONSE STRUCTURE (Use as applicable)
-----------------------------------------
-
-If the query is about Buying / Recommendation:
-
-Recommended Models (2-4 options):
-- Model Name - Price Range (INR)
-
-For each model include:
-- Mileage:
-- Key Features (Top 3):
-- Best For:
-
-Short Verdict: Which option is better and why.
-
-----------------------------------------
-
-If the query is about Comparison:
-
-Comparison Overview:
-- Price Difference:
-- Mileage Difference:
-- Feature Highlights:
-- Pros & Cons (each model)
-
-Recommendation: Which one to choose and for what type of buyer.
-
-----------------------------------------
-
-If the query is about Maintenance:
-
-Maintenance Advice:
-- Key Checks:
-- Seasonal Tips (if relevant):
-- Estimated Service Cost Level:
-
-----------------------------------------
-
-If the query is about Eco-Friendly Vehicles:
-
-Recommended EV/Hybrid Options:
-- Model - Price - Range (km/charge)
-
-Include:
-- Charging Time:
-- Running Cost Benefit:
-- Government Incentives (India context if applicable)
-
-End every response with a short 2-3 line practical summary.
-"""
-
-    def get_text_response(prompt):
-        model = load_model()
-        response = model.generate_content(prompt)
-        return response.text
-
     # Display chat history
     for role, msg in st.session_state.messages:
         if role == "user":
@@ -286,11 +459,32 @@ End every response with a short 2-3 line practical summary.
         if user_input:
             st.session_state.messages.append(("user", user_input))
 
-            with st.spinner("Thinking..."):
-                response = get_text_response(build_prompt(user_input))
-
-            st.session_state.messages.append(("bot", response))
-            st.rerun()
+            try:
+                if STREAM_RESPONSES:
+                    st.markdown(f"**🧑 You:** {user_input}")
+                    st.markdown("**🚗 AutoSage:**")
+                    with st.spinner("Thinking..."):
+                        response = render_stream(stream_chat_response(user_input))
+                else:
+                    with st.spinner("Thinking..."):
+                        response = get_chat_response(user_input)
+            except circuit_breaker.CircuitOpenError:
+                response = get_degraded_chat_response(user_input)
+                if response is None:
+                    st.session_state.messages.pop()
+                    st.error(MODEL_UNAVAILABLE_MESSAGE)
+                else:
+                    st.session_state.messages.append(
+                        ("bot", f"_{DEGRADED_NOTICE}_\n\n{response}")
+                    )
+                    st.rerun()
+            except retry.MODEL_ERRORS:
+                # Drop the unanswered question so the user can simply resend it
+                st.session_state.messages.pop()
+                st.error(MODEL_UNAVAILABLE_MESSAGE)
+            else:
+                st.session_state.messages.append(("bot", response))
+                st.rerun()
 
 
 # ============================================
@@ -298,4 +492,4 @@ End every response with a short 2-3 line practical summary.
 # ============================================
 
 st.markdown("---")
-st.caption("AutoSage • Multimodal AI Vehicle Expert • Powered by Gemini 2.5 Flash")
+st.caption("AutoSage • Multimodal AI Vehicle Expert • Powered by Google Gemini")
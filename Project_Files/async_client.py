@@ -0,0 +1,192 @@
+# ============================================
+# AutoSage - Async Gemini Client
+# ============================================
+# Every model call goes through the breaker, rate limiter and retry policy
+# here. Calls are coroutines, so fan-out work (several images, several
+# models) runs concurrently on one thread instead of one blocked thread
+# per call, and callers get real cancellation and timeouts.
+#
+# The SDK's async transport is a grpc.aio channel shared by the whole
+# process, and such a channel only works on the event loop that created
+# it. All coroutines that touch the model therefore run on a single
+# runtime loop owned by this module:
+#   - synchronous code (the Streamlit script thread) uses run()/iterate(),
+#   - code already inside some other event loop (an ASGI service) awaits
+#     call(), which hands the coroutine to the runtime loop.
+
+import asyncio
+import threading
+
+import rate_limit
+import retry
+from circuit_breaker import breaker
+from model_client import _request_options, _usage
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _runtime_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="autosage-async", daemon=True
+            ).start()
+            _loop = loop
+    return _loop
+
+
+async def _in_session(coro, session):
+    # Tasks on the runtime loop do not inherit the caller's context, so
+    # carry the session over for fair queueing in the rate limiter
+    rate_limit.current_session.set(session)
+    return await coro
+
+
+def submit(coro):
+    """Schedule `coro` on the runtime loop; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(
+        _in_session(coro, rate_limit.current_session.get()), _runtime_loop()
+    )
+
+
+def run(coro, timeout=None):
+    """Run `coro` on the runtime loop and block until it finishes.
+
+    The coroutine is cancelled if the wait times out or is interrupted
+    (e.g. Streamlit stopping the script on a rerun).
+    """
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+async def call(coro):
+    """Await `coro` on the runtime loop from any other event loop."""
+    if asyncio.get_running_loop() is _runtime_loop():
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
+
+
+def iterate(agen):
+    """Drive an async generator from synchronous code, chunk by chunk.
+
+    Closing the returned generator early closes `agen` on the runtime loop.
+    """
+    try:
+        while True:
+            try:
+                yield run(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        run(agen.aclose())
+
+
+async def aiterate(agen):
+    """Re-yield an async generator running on the runtime loop from any loop."""
+    try:
+        while True:
+            try:
+                yield await call(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        await call(agen.aclose())
+
+
+async def generate_text(model, contents, policy=None):
+    """Full response text; must run on the runtime loop.
+
+    Raises CircuitOpenError while the upstream is being shed.
+    """
+    policy = policy or retry.default_policy
+    started_at = policy.start()
+    attempt = 0
+    while True:
+        try:
+            estimate = rate_limit.estimate_tokens(contents)
+            timeout = policy.remaining(started_at)
+            with breaker.guard() as call_:
+                async with rate_limit.limiter.aslot(estimate) as record_usage:
+                    call_.begin()
+                    async with asyncio.timeout(max(timeout, 1.0)):
+                        response = await model.generate_content_async(
+                            contents, request_options=_request_options(timeout)
+                        )
+                    record_usage(_usage(response))
+            return response.text
+        except Exception as exc:
+            await asyncio.sleep(policy.next_delay(exc, attempt, started_at))
+            attempt += 1
+
+
+async def stream_text(model, contents, policy=None):
+    """Yield response text chunk by chunk; must run on the runtime loop.
+
+    The limiter slot is held until the stream is exhausted or closed.
+    Failures are retried only until the first chunk has been yielded;
+    after that the caller has already shown partial output.
+    """
+    policy = policy or retry.default_policy
+    started_at = policy.start()
+    attempt = 0
+    while True:
+        streamed = False
+        try:
+            estimate = rate_limit.estimate_tokens(contents)
+            timeout = policy.remaining(started_at)
+            with breaker.guard() as call_:
+                async with rate_limit.limiter.aslot(estimate) as record_usage:
+                    call_.begin()
+                    response = await model.generate_content_async(
+                        contents,
+                        stream=True,
+                        request_options=_request_options(timeout),
+                    )
+                    async for chunk in response:
+                        call_.responded()
+                        # Chunks without parts (e.g. a trailing finish-reason
+                        # chunk) have no text
+                        if chunk.parts:
+                            streamed = True
+                            yield chunk.text
+                    record_usage(_usage(response))
+            return
+        except Exception as exc:
+            if streamed:
+                raise
+            await asyncio.sleep(policy.next_delay(exc, attempt, started_at))
+            attempt += 1
+
+
+async def map_as_completed(fn, items, limit=4, timeout=None):
+    """Yield (index, result_or_exception) as each `await fn(item)` finishes.
+
+    At most `limit` calls are in flight. Each call gets its own `timeout`;
+    a failing item does not cancel the others. If the consumer stops early
+    or is cancelled, the calls still running are cancelled too.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def one(index, item):
+        async with semaphore:
+            try:
+                async with asyncio.timeout(timeout):
+                    return index, await fn(item)
+            except Exception as exc:
+                return index, exc
+
+    tasks = [asyncio.create_task(one(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,294 @@
+# ============================================
+# AutoSage - Offline Batch Image Analysis
+# ============================================
+# Command-line counterpart of the image analysis page, for backfills:
+#
+#   python batch_analyze.py photos/ -o results.jsonl
+#   python batch_analyze.py photos.zip -o results.parquet --concurrency 16
+#   python batch_analyze.py photos/ -o reports.csv --structured
+#
+# Images are read from a directory tree or a ZIP archive, go through the
+# same preprocessing, prompt, caches and routing as the app, and are sent
+# to the model concurrently under the shared rate limiter. Every result is
+# appended to a JSONL journal as soon as it arrives, keyed by the SHA-256
+# of the original file, so a crashed or interrupted run can simply be
+# started again: files whose content was already analyzed are skipped.
+# CSV and Parquet outputs are written from the journal at the end.
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+import analysis
+import analysis_parser
+import async_client
+import circuit_breaker
+import image_preprocess
+import model_client
+
+logger = logging.getLogger("autosage.batch")
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+OUTPUT_FORMATS = ("jsonl", "csv", "parquet")
+
+# Summary columns, e.g. "Average Price in INR" -> "average_price_in_inr"
+FIELD_COLUMNS = {
+    name: name.lower().replace(" ", "_") for name in analysis.SUMMARY_FIELDS
+}
+
+
+# ============================================
+# 1️⃣ Reading Images From A Folder Or ZIP
+# ============================================
+
+def _is_image(name):
+    return Path(name).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def iter_sources(source):
+    """Yield (name, read) pairs; read() returns the file's bytes.
+
+    `source` is a directory or an open zipfile.ZipFile, which the caller
+    closes once every read() has run. Files are read lazily so a
+    100k-image source is never held in memory.
+    """
+    if isinstance(source, zipfile.ZipFile):
+        for info in source.infolist():
+            if not info.is_dir() and _is_image(info.filename):
+                yield info.filename, (lambda info=info: source.read(info))
+        return
+    source = Path(source)
+    if not source.is_dir():
+        raise SystemExit(f"{source} is neither a directory nor a ZIP archive")
+    for path in sorted(source.rglob("*")):
+        if path.is_file() and _is_image(path.name):
+            yield str(path.relative_to(source)), path.read_bytes
+
+
+# ============================================
+# 2️⃣ Resumable Results Journal
+# ============================================
+
+def journal_path(output):
+    output = Path(output)
+    if output.suffix == ".jsonl":
+        return output
+    return output.with_name(output.name + ".partial.jsonl")
+
+
+def read_journal(path):
+    """Latest journal row per content hash; a torn last line is ignored."""
+    rows = {}
+    if not path.exists():
+        return rows
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            rows[row["sha256"]] = row
+    return rows
+
+
+def write_output(rows, output, output_format):
+    if output_format == "jsonl":
+        return
+    import pandas as pd
+
+    frame = pd.DataFrame(rows)
+    if output_format == "csv":
+        frame.to_csv(output, index=False)
+    else:
+        # Needs pyarrow (installed with streamlit)
+        frame.to_parquet(output, index=False)
+
+
+# ============================================
+# 3️⃣ Concurrent Analysis Under The Shared Limiter
+# ============================================
+
+def _read(read):
+    raw = read()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def _prepare(raw):
+    image_bytes, mime_type = image_preprocess.preprocess_image(raw)
+    return {"mime_type": mime_type, "data": image_bytes}
+
+
+def _report_columns(report):
+    # One column per report field; lists joined so CSV stays flat
+    return {
+        name: "; ".join(value) if isinstance(value, tuple) else value
+        for name, value in report.to_dict().items()
+    }
+
+
+async def _analyze(image_data, structured):
+    # A backfill has nowhere to degrade to: wait out an open circuit instead
+    fn = (
+        analysis.get_image_report_async
+        if structured
+        else analysis.get_image_response_async
+    )
+    while True:
+        try:
+            return await fn(image_data)
+        except circuit_breaker.CircuitOpenError as exc:
+            await asyncio.sleep(max(exc.retry_in, 1.0))
+
+
+async def run_batch(
+    sources, done, journal, concurrency, workers, structured=False
+):
+    """Analyze every source whose hash is not in `done`; returns counts."""
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    semaphore = asyncio.Semaphore(concurrency)
+    seen = set(done)
+    counts = {"analyzed": 0, "failed": 0, "skipped": 0}
+    started = time.monotonic()
+
+    async def one(name, read):
+        try:
+            # Hashing and preprocessing are CPU work; keep them off the loop.
+            # Files already analyzed are skipped before paying for a decode.
+            raw, digest = await loop.run_in_executor(pool, _read, read)
+            if digest in seen:
+                counts["skipped"] += 1
+                return
+            seen.add(digest)
+            image_data = await loop.run_in_executor(pool, _prepare, raw)
+            del raw
+            row = {"file": name, "sha256": digest}
+            try:
+                result = await _analyze(image_data, structured)
+            except Exception as exc:
+                row.update(status="error", error=f"{type(exc).__name__}: {exc}")
+                counts["failed"] += 1
+            else:
+                row.update(status="ok", error="")
+                if structured:
+                    row.update(_report_columns(result))
+                    parsed = analysis_parser.normalize_report(result)
+                else:
+                    parsed = analysis_parser.parse_analysis(result)
+                    analysis.normalize_vehicle(parsed.report)
+                    fields = parsed.report.summary_row()
+                    row.update((FIELD_COLUMNS[k], v) for k, v in fields.items())
+                    row["analysis"] = result
+                # Numeric price, mileage and engine columns for querying
+                row.update(parsed.numbers())
+                counts["analyzed"] += 1
+            journal.write(json.dumps(row, ensure_ascii=False) + "\n")
+            journal.flush()
+        except Exception:
+            counts["failed"] += 1
+            logger.exception("Could not process %s", name)
+        finally:
+            semaphore.release()
+
+        total = counts["analyzed"] + counts["failed"]
+        if total and total % 100 == 0:
+            rate = total / (time.monotonic() - started)
+            logger.info("%s (%.1f images/s)", counts, rate)
+
+    tasks = set()
+    try:
+        for name, read in sources:
+            # Bounded window: never more than `concurrency` files in flight
+            await semaphore.acquire()
+            task = asyncio.create_task(one(name, read))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.shutdown(cancel_futures=True)
+    return counts
+
+
+# ============================================
+# 4️⃣ Command Line Entry Point
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analyze a folder or ZIP of vehicle images with AutoSage."
+    )
+    parser.add_argument("source", help="directory or .zip of images")
+    parser.add_argument(
+        "-o", "--output", required=True, help="results file (.jsonl, .csv, .parquet)"
+    )
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="default: from suffix")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="images analyzed at once"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 4,
+        help="threads for hashing and preprocessing",
+    )
+    parser.add_argument(
+        "--structured",
+        action="store_true",
+        help="request JSON reports and write one column per report field",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="ignore earlier results and start over"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    output_format = args.format or Path(args.output).suffix.lstrip(".")
+    if output_format not in OUTPUT_FORMATS:
+        parser.error(f"unknown output format {output_format!r}")
+
+    load_dotenv(Path(__file__).parent / ".env")
+    model_client.configure(os.getenv("GOOGLE_API_KEY"))
+
+    journal = journal_path(args.output)
+    if args.restart and journal.exists():
+        journal.unlink()
+    rows = read_journal(journal)
+    done = {digest for digest, row in rows.items() if row["status"] == "ok"}
+    if done:
+        logger.info("Resuming: %d images already analyzed", len(done))
+
+    source = Path(args.source)
+    with contextlib.ExitStack() as stack:
+        if zipfile.is_zipfile(source):
+            source = stack.enter_context(zipfile.ZipFile(source))
+        f = stack.enter_context(journal.open("a", encoding="utf-8"))
+        counts = async_client.run(
+            run_batch(
+                iter_sources(source),
+                done,
+                f,
+                args.concurrency,
+                args.workers,
+                args.structured,
+            )
+        )
+    logger.info("Finished: %s", counts)
+
+    write_output(list(read_journal(journal).values()), args.output, output_format)
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
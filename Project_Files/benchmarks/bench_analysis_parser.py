@@ -0,0 +1,192 @@
+# ============================================
+# Benchmark - Markdown Analysis Parser Throughput
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_analysis_parser.py
+#
+# Generates N synthetic image analyses with the drift seen in real model
+# output (bold or numbered headers, renamed sections, missing sections,
+# several price and mileage notations), parses them all and reports
+# throughput, the score distribution and how often the normalized price
+# and mileage match the values the sample was generated from.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analysis_parser  # noqa: E402
+
+N = 100_000
+
+VEHICLES = [
+    ("Tata", "Nexon", "Compact SUV", "Petrol", 1199),
+    ("Maruti Suzuki", "Swift", "Hatchback", "Petrol", 1197),
+    ("Hyundai", "Creta", "SUV", "Diesel", 1493),
+    ("Mahindra", "XUV700", "SUV", "Diesel", 2184),
+    ("Royal Enfield", "Classic 350", "Motorcycle", "Petrol", 349),
+    ("Honda", "Activa 6G", "Scooter", "Petrol", 109),
+    ("Tata", "Nexon EV", "Compact SUV", "Electric", None),
+    ("Maruti Suzuki", "WagonR", "Hatchback", "CNG", 998),
+]
+
+# How a header is decorated: "**Brand:** Tata", "1. Brand: Tata", ...
+HEADERS = [
+    "**{}:** {}",
+    "{}: {}",
+    "### {}: {}",
+    "- **{}**: {}",
+]
+TITLES = {
+    "brand": ["Brand", "Make"],
+    "model": ["Model", "Model Name"],
+    "price": ["Average Price in INR", "Price Range", "Price"],
+    "mileage": ["Mileage", "Fuel Efficiency"],
+}
+
+
+def _price(rng, low, high):
+    style = rng.randrange(7)
+    if style == 0:
+        return f"₹{low / 1e5:g}–{high / 1e5:g} lakh (ex-showroom)"
+    if style == 1:
+        return f"Rs. {low / 1e5:g} - {high / 1e5:g} Lakhs"
+    if style == 2:
+        return f"₹{low:,} to ₹{high:,}"
+    if style == 3:
+        return f"₹{low:,} – ₹{high / 1e5:g} lakh"
+    if style == 4:
+        return f"₹{low / 1e5:g} lakh to ₹{high / 1e5:g} lakh (ex-showroom, 2024)"
+    if style == 5:
+        return f"₹{low / 1e5:g}–{high / 1e5:g} lakh (approx, 2023 prices)"
+    return f"{low / 1e5:g} - {high / 1e5:g} (in lakhs)"
+
+
+def _mileage(rng, fuel, low, high):
+    if fuel == "Electric":
+        return f"{low}-{high} km per charge (ARAI)"
+    if fuel == "CNG":
+        return f"{low}–{high} km/kg"
+    return rng.choice([f"{low}-{high} kmpl", f"{low} to {high} km/l"])
+
+
+def sample(rng):
+    brand, model, body, fuel, cc = rng.choice(VEHICLES)
+    low = rng.randrange(5, 200) * 10_000
+    high = low + rng.randrange(1, 50) * 10_000
+    m_low = rng.randrange(10, 40)
+    m_high = m_low + rng.randrange(0, 8)
+    header = rng.choice(HEADERS)
+    numbered = rng.random() < 0.3
+
+    def line(n, key, value):
+        title = rng.choice(TITLES[key]) if key in TITLES else key
+        text = header.format(title, value)
+        return f"{n}. {text}" if numbered else text
+
+    engine = f"{cc} cc" if cc else "Permanent magnet motor"
+    lines = [
+        line(1, "brand", brand),
+        line(2, "model", model),
+        line(3, "Launch Year", rng.randrange(2010, 2025)),
+        line(4, "Vehicle Type", body),
+        line(5, "Fuel Type", fuel),
+        "**Key Features:**",
+        f"- Engine Capacity: {engine}",
+        "- Transmission Type: 6-speed manual",
+        "- Top 3 Special Features:",
+        "  - Touchscreen infotainment",
+        "  - Connected car tech",
+        "  - LED projector headlamps",
+        line(7, "mileage", _mileage(rng, fuel, m_low, m_high)),
+        "**Performance:**",
+        "- Power Output: 118 bhp",
+        "- Torque (if known): 170 Nm",
+        line(9, "price", _price(rng, low, high)),
+        line(10, "Maintenance Level", rng.choice(["Low", "Medium", "High"])),
+        "**Safety Features:**",
+        "- Dual airbags",
+        "- ABS with EBD",
+        "**Other Details:**",
+        "- Maintenance cost (approx): ₹5,000–8,000 per year",
+        "- Unique selling points: Strong build quality",
+        "- Target audience: Young families",
+        line(13, "Approximate Resale Value", "₹4–6 lakh after 3 years"),
+        "",
+        f"The {brand} {model} is a dependable choice. It suits daily commutes.",
+    ]
+    # Drift: now and then a section is left out entirely
+    if rng.random() < 0.1:
+        del lines[rng.randrange(len(lines) - 2)]
+    text = "\n".join(lines)
+    return text, (low, high), (float(m_low), float(m_high))
+
+
+# Notations that have tripped the parser up before
+PRICE_CASES = [
+    ("₹79,000 – ₹1.05 lakh", (79_000, 105_000)),
+    ("₹8 lakh to ₹10 lakh (ex-showroom, 2024)", (800_000, 1_000_000)),
+    ("₹8–10 lakh (approx, 2023 prices)", (800_000, 1_000_000)),
+    ("8 - 10 (in lakhs)", (800_000, 1_000_000)),
+    ("₹4–6 lakh after 3 years", (400_000, 600_000)),
+    ("₹1.5-2 crore", (15_000_000, 20_000_000)),
+]
+MILEAGE_CASES = [
+    ("1,200 km", (1200.0, 1200.0, "km/charge")),
+    ("1,000-1,200 km per charge", (1000.0, 1200.0, "km/charge")),
+    ("17.5 - 20 kmpl", (17.5, 20.0, "km/l")),
+    ("25-28 km/kg (CNG)", (25.0, 28.0, "km/kg")),
+]
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def main():
+    rng = random.Random(0)
+    samples = [sample(rng) for _ in range(N)]
+    texts = [text for text, _, _ in samples]
+    print(f"samples: {N:,}, mean size {sum(map(len, texts)) / N:.0f} chars")
+
+    start = time.perf_counter()
+    results = [analysis_parser.parse_analysis(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    print(
+        f"parse: {elapsed:.2f} s total, {N / elapsed:,.0f} analyses/s, "
+        f"{elapsed / N * 1e6:.1f} us/analysis"
+    )
+
+    scores = [parsed.score for parsed in results]
+    print(
+        f"score: mean {sum(scores) / N:.3f}, p1 {percentile(scores, 1):.3f}, "
+        f"p50 {percentile(scores, 50):.3f}, "
+        f"complete {sum(s == 1.0 for s in scores) / N:.1%}"
+    )
+
+    price_ok = mileage_ok = 0
+    for parsed, (_, price, mileage) in zip(results, samples):
+        price_ok += (parsed.price_min_inr, parsed.price_max_inr) == price
+        mileage_ok += (parsed.mileage_min, parsed.mileage_max) == mileage
+    print(f"price exact: {price_ok / N:.1%}, mileage exact: {mileage_ok / N:.1%}")
+
+    exact = 0
+    for text, expected in PRICE_CASES:
+        got = analysis_parser.parse_inr_range(text)
+        exact += got == expected
+        if got != expected:
+            print(f"  price case {text!r}: got {got}, expected {expected}")
+    print(f"price cases: {exact}/{len(PRICE_CASES)} exact")
+
+    exact = 0
+    for text, expected in MILEAGE_CASES:
+        got = analysis_parser.parse_mileage(text)
+        exact += got == expected
+        if got != expected:
+            print(f"  mileage case {text!r}: got {got}, expected {expected}")
+    print(f"mileage cases: {exact}/{len(MILEAGE_CASES)} exact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# ============================================
+# Benchmark - Catalog Filter And Rank Latency
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_catalog.py
+#
+# Builds catalogs of N synthetic models and times parse_filters() and
+# Catalog.search() for typical recommendation queries. Rows are random but
+# shaped like specs_kb.catalog_rows() output, so the arrays are the same.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import catalog  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = [
+    "Best bikes under 2 lakhs",
+    "Best electric cars under 20 lakhs",
+    "suv between 8 and 12 lakh",
+    "petrol scooter around 1 lakh",
+    "which diesel SUV",
+]
+LOOKUPS = 500
+
+SEGMENTS = [
+    ("Motorcycle", ["Petrol", "Electric"], (60_000, 400_000), "km/l"),
+    ("Scooter", ["Petrol", "Electric"], (60_000, 160_000), "km/l"),
+    ("Hatchback", ["Petrol", "Petrol / CNG", "Electric"], (400_000, 999_000), "km/l"),
+    ("Sedan", ["Petrol", "Diesel", "Hybrid"], (700_000, 2_500_000), "km/l"),
+    ("Compact SUV", ["Petrol / Diesel", "Electric"], (800_000, 1_600_000), "km/l"),
+    ("SUV", ["Diesel", "Petrol", "Electric"], (1_200_000, 4_000_000), "km/l"),
+    ("MUV", ["Petrol / CNG", "Diesel"], (900_000, 2_500_000), "km/l"),
+]
+
+
+def make_rows(n, rng):
+    rows = []
+    for i in range(n):
+        vehicle_type, fuels, (low, high), unit = rng.choice(SEGMENTS)
+        fuel = rng.choice(fuels)
+        price_min = rng.randrange(low, high, 10_000)
+        if "Electric" in fuel:
+            mileage, unit = rng.randrange(80, 500), "km/charge"
+        else:
+            two_wheeler = vehicle_type in ("Motorcycle", "Scooter")
+            mileage = rng.randrange(10, 60 if two_wheeler else 28)
+        rows.append(
+            {
+                "brand": f"Brand{i % 40}",
+                "model": f"Model {i}",
+                "vehicle_type": vehicle_type,
+                "fuel_type": fuel,
+                "price_range_inr": f"₹{price_min / 1e5:g} lakh onwards",
+                "mileage": f"{mileage} {unit}",
+                "price_min_inr": price_min,
+                "price_max_inr": price_min + rng.randrange(0, 500_000, 10_000),
+                "mileage_min": mileage,
+                "mileage_max": mileage,
+                "mileage_unit": unit,
+                "engine_cc": None,
+            }
+        )
+    return rows
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def main():
+    rng = random.Random(0)
+    filters = [catalog.parse_filters(q) for q in QUERIES]
+
+    samples = []
+    for i in range(LOOKUPS):
+        start = time.perf_counter()
+        catalog.parse_filters(QUERIES[i % len(QUERIES)])
+        samples.append((time.perf_counter() - start) * 1e6)
+    print(f"parse_filters: p50 {percentile(samples, 50):.1f} us")
+
+    print(f"{'models':>10} {'build':>10} {'p50':>10} {'p99':>10}")
+    for size in SIZES:
+        rows = make_rows(size, rng)
+        start = time.perf_counter()
+        index = catalog.Catalog(rows)
+        build_s = time.perf_counter() - start
+
+        samples = []
+        for i in range(LOOKUPS):
+            start = time.perf_counter()
+            index.search(filters[i % len(filters)])
+            samples.append((time.perf_counter() - start) * 1e6)
+        print(
+            f"{size:>10,} {build_s * 1e3:>8.0f}ms "
+            f"{percentile(samples, 50):>8.1f}us {percentile(samples, 99):>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
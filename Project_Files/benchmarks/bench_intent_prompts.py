@@ -0,0 +1,113 @@
+# ============================================
+# Benchmark - Intent-Specific Chat Prompts
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_intent_prompts.py [--live]
+#
+# Classifies labelled chat queries, then compares the full chat template
+# with the compact prompt for each query's intent: classifier accuracy and
+# latency, and input tokens per intent (rate_limit.estimate_tokens, without
+# its output allowance). With --live and GOOGLE_API_KEY set, it also times
+# one model call per query with each prompt.
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analysis  # noqa: E402
+import intent  # noqa: E402
+import rate_limit  # noqa: E402
+
+LOOKUPS = 20
+
+# (query, expected intent); None means the full template should be used
+QUERIES = [
+    ("Best bikes under 2 lakhs", intent.BUYING),
+    ("Which SUV should I buy for a family of five?", intent.BUYING),
+    ("Suggest a first car for a college student", intent.BUYING),
+    ("Top scooters below 1 lakh", intent.BUYING),
+    ("Recommend an automatic hatchback for city driving", intent.BUYING),
+    ("Affordable 7 seater options under 15 lakh", intent.BUYING),
+    ("Compare Nexon and Brezza", intent.COMPARISON),
+    ("Creta vs Seltos", intent.COMPARISON),
+    ("Difference between Classic 350 and Hunter 350", intent.COMPARISON),
+    ("Is the Swift better than the i20?", intent.COMPARISON),
+    ("Comparison of XUV700 and Harrier", intent.COMPARISON),
+    ("Activa or Jupiter?", intent.COMPARISON),
+    ("Winter car maintenance tips", intent.MAINTENANCE),
+    ("How often should I change engine oil in my bike?", intent.MAINTENANCE),
+    ("Monsoon care for two wheelers", intent.MAINTENANCE),
+    ("When to replace brake pads and tyres", intent.MAINTENANCE),
+    ("Clutch noise on my Splendor, what to check", intent.MAINTENANCE),
+    ("Car service checklist", intent.MAINTENANCE),
+    ("Best electric cars under 20 lakhs", intent.ECO),
+    ("Hybrid cars with good mileage", intent.ECO),
+    ("Eco-friendly scooters for daily commute", intent.ECO),
+    ("EV charging time at home", intent.ECO),
+    ("Government subsidy for electric two wheelers", intent.ECO),
+    ("Which EV has the longest range?", intent.ECO),
+    ("Tell me about the Tata Punch", None),
+    ("Hello", None),
+]
+
+
+def input_tokens(prompt):
+    return rate_limit.estimate_tokens(prompt) - rate_limit.OUTPUT_TOKENS
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def time_model(prompt):
+    import async_client
+    import model_client
+
+    start = time.perf_counter()
+    async_client.run(async_client.generate_text(model_client.get_model(), prompt))
+    return time.perf_counter() - start
+
+
+def main():
+    live = "--live" in sys.argv
+    samples = []
+    correct = 0
+    for query, expected in QUERIES:
+        for _ in range(LOOKUPS):
+            start = time.perf_counter()
+            got = intent.classify(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+        correct += got == expected
+        if got != expected:
+            print(f"  miss: {query!r} -> {got} (expected {expected})")
+    print(
+        f"classify: {correct}/{len(QUERIES)} correct, "
+        f"p50 {percentile(samples, 50):.1f} us, p99 {percentile(samples, 99):.1f} us"
+    )
+
+    print(
+        f"{'intent':>12} {'full tok':>9} {'compact':>9} {'saved':>7}"
+        + (f" {'full s':>8} {'compact s':>10}" if live else "")
+    )
+    for name in (*intent.INTENTS, None):
+        queries = [q for q, expected in QUERIES if expected == name]
+        full = [analysis.build_prompt(q) for q in queries]
+        compact = [analysis.build_prompt(q, intent.classify(q)) for q in queries]
+        full_tokens = statistics.mean(map(input_tokens, full))
+        compact_tokens = statistics.mean(map(input_tokens, compact))
+        line = (
+            f"{name or 'general':>12} {full_tokens:>9.0f} {compact_tokens:>9.0f} "
+            f"{1 - compact_tokens / full_tokens:>7.0%}"
+        )
+        if live:
+            line += (
+                f" {statistics.mean(map(time_model, full)):>8.2f}"
+                f" {statistics.mean(map(time_model, compact)):>10.2f}"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# ============================================
+# Benchmark - Vehicle Name Resolution Latency
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_name_resolver.py
+#
+# Builds a NameIndex over synthetic vehicles until it holds at least 50k
+# aliases, then times resolve() for exact names, partial names and typos,
+# find_mentions() over chat-style queries and resolve_batch() throughput.
+# Finally a few real names and misspellings are checked exactly.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import name_resolver  # noqa: E402
+
+TARGET_ALIASES = 50_000
+LOOKUPS = 2_000
+
+BRANDS = [
+    "Maruti Suzuki", "Tata", "Mahindra", "Hyundai", "Kia", "Toyota", "Honda",
+    "Royal Enfield", "Bajaj", "TVS", "Hero", "Ola Electric", "Ather", "MG",
+    "Skoda", "Volkswagen", "Renault", "Nissan", "Jeep", "Yamaha",
+]
+SYLLABLES = ["ne", "xon", "bre", "zza", "cre", "ta", "sel", "tos", "pun", "ch",
+             "vi", "tara", "al", "to", "sw", "ift", "ka", "ra", "zo", "ri",
+             "pul", "sar", "ju", "pi", "ter", "ac", "ti", "va", "hun", "ter"]
+SUFFIXES = ["", "", " EV", " Max", " Plus", " 350", " 200", " CNG", " N Line"]
+
+REAL_VEHICLES = [
+    ("maruti-vitara-brezza", "Maruti Suzuki", "Vitara Brezza"),
+    ("maruti-grand-vitara", "Maruti Suzuki", "Grand Vitara"),
+    ("tata-nexon", "Tata", "Nexon"),
+    ("tata-nexon-ev", "Tata", "Nexon EV"),
+    ("re-classic-350", "Royal Enfield", "Classic 350"),
+    ("re-classic-500", "Royal Enfield", "Classic 500"),
+    ("re-hunter-350", "Royal Enfield", "Hunter 350"),
+    ("hyundai-i20", "Hyundai", "i20"),
+    ("mahindra-xuv700", "Mahindra", "XUV700"),
+]
+# (text, key it must resolve to or None)
+NAME_CASES = [
+    ("brezaa", "maruti-vitara-brezza"),
+    ("maruti brezaa", "maruti-vitara-brezza"),
+    ("nexom", "tata-nexon"),
+    ("nexon ev", "tata-nexon-ev"),
+    ("xuv 700", "mahindra-xuv700"),
+    ("i 20", "hyundai-i20"),
+    ("clasic 350", "re-classic-350"),
+    ("classic", None),
+    ("vitara", None),
+    ("350", None),
+    ("royal enfield 350", None),
+]
+# (query, keys find_mentions() must return)
+MENTION_CASES = [
+    ("compare nexon and brezaa", ["tata-nexon", "maruti-vitara-brezza"]),
+    ("is 500 km range enough for a 500 cc bike", []),
+]
+
+
+def make_vehicles(rng):
+    vehicles = []
+    seen = set()
+    index = name_resolver.NameIndex([])
+    while len(index) < TARGET_ALIASES:
+        batch = []
+        for _ in range(2_000):
+            brand = rng.choice(BRANDS)
+            word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+            model = word.title() + rng.choice(SUFFIXES)
+            if rng.random() < 0.2:
+                prefix = rng.choice(["XUV", "NS", "RX", "i"])
+                model = f"{prefix}{rng.randrange(10, 999)}"
+            key = f"{brand}|{model}".casefold()
+            if key not in seen:
+                seen.add(key)
+                batch.append((key, brand, model))
+        vehicles.extend(batch)
+        index = name_resolver.NameIndex(vehicles)
+    return vehicles, index
+
+
+def _typo(rng, text):
+    # A doubled letter, e.g. "brezzza"; doubling a digit would name a
+    # different model ("Classic 3550"), which must not resolve
+    i = rng.choice([i for i, c in enumerate(text) if c.isalpha()])
+    return text[:i] + text[i] + text[i:]
+
+
+def _slip(rng, text):
+    # The last letter of the name retyped as its neighbour, e.g. "brezaa"
+    i = max(i for i, c in enumerate(text) if c.isalpha())
+    if i == 0 or not text[i - 1].isalpha() or text[i - 1] == text[i]:
+        return _typo(rng, text)
+    return text[:i] + text[i - 1] + text[i + 1:]
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def time_calls(fn, inputs):
+    samples = []
+    hits = 0
+    for value in inputs:
+        start = time.perf_counter()
+        result = fn(value)
+        samples.append((time.perf_counter() - start) * 1e6)
+        hits += bool(result)
+    return samples, hits
+
+
+def main():
+    rng = random.Random(0)
+    vehicles, _ = make_vehicles(rng)
+    start = time.perf_counter()
+    index = name_resolver.NameIndex(vehicles)
+    build_s = time.perf_counter() - start
+    print(
+        f"vehicles: {len(vehicles):,}, aliases: {len(index):,}, "
+        f"build {build_s:.2f} s"
+    )
+
+    sample = [rng.choice(vehicles) for _ in range(LOOKUPS)]
+    cases = {
+        "exact": [f"{brand} {model}" for _, brand, model in sample],
+        "model only": [model for _, _, model in sample],
+        "typo": [_typo(rng, model) for _, _, model in sample],
+        "slip": [_slip(rng, model) for _, _, model in sample],
+        "unknown": ["Zzyzx Qwerty" for _ in sample],
+    }
+    print(f"{'case':>12} {'p50':>10} {'p99':>10} {'resolved':>10}")
+    for case, inputs in cases.items():
+        samples, hits = time_calls(index.resolve, inputs)
+        print(
+            f"{case:>12} {percentile(samples, 50):>8.1f}us "
+            f"{percentile(samples, 99):>8.1f}us {hits / len(inputs):>10.1%}"
+        )
+
+    queries = [
+        f"Compare {a[2]} and {b[2]} for city driving under 12 lakh"
+        for a, b in zip(sample, reversed(sample))
+    ]
+    samples, _ = time_calls(index.find_mentions, queries)
+    print(
+        f"{'mentions':>12} {percentile(samples, 50):>8.1f}us "
+        f"{percentile(samples, 99):>8.1f}us"
+    )
+
+    start = time.perf_counter()
+    index.resolve_batch(cases["typo"])
+    elapsed = time.perf_counter() - start
+    print(f"batch: {len(cases['typo']) / elapsed:,.0f} typo names/s")
+
+    real = name_resolver.NameIndex(REAL_VEHICLES)
+    exact = 0
+    for text, expected in NAME_CASES:
+        match = real.resolve(text)
+        got = match.key if match else None
+        exact += got == expected
+        if got != expected:
+            print(f"  name case {text!r}: got {got}, expected {expected}")
+    for text, expected in MENTION_CASES:
+        got = [match.key for match in real.find_mentions(text)]
+        exact += got == expected
+        if got != expected:
+            print(f"  mention case {text!r}: got {got}, expected {expected}")
+    print(f"name cases: {exact}/{len(NAME_CASES) + len(MENTION_CASES)} exact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# ============================================
+# Benchmark - Near-Duplicate Image Lookup Latency
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_phash.py
+#
+# Fills a PHashIndex with N random 64-bit hashes and times search() for
+# queries a few bits away from a stored hash (re-uploads) and for unrelated
+# hashes (misses), at the normal and degraded radii. Every result is
+# checked against a brute-force NumPy scan of all stored hashes.
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import phash_index  # noqa: E402
+import response_cache  # noqa: E402
+
+SIZES = [100_000, 200_000]
+RADII = [
+    4,
+    response_cache.PHASH_MAX_DISTANCE,
+    response_cache.DEGRADED_PHASH_MAX_DISTANCE,
+]
+LOOKUPS = 500
+CHECKED = 100
+
+
+def flip_bits(rng, value, count):
+    for bit in rng.sample(range(phash_index.HASH_BITS), count):
+        value ^= 1 << bit
+    return value
+
+
+def brute_force(hashes, query, max_distance):
+    distances = np.bitwise_count(hashes ^ np.uint64(query))
+    return sorted(int(h) for h in hashes[distances <= max_distance])
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'hashes':>9} {'radius':>7} {'case':>6} {'p50':>9} {'p99':>9} {'exact':>7}")
+    for size in SIZES:
+        index = phash_index.PHashIndex(maxsize=size)
+        stored = [rng.getrandbits(64) for _ in range(size)]
+        for i, value in enumerate(stored):
+            index.add(value, i)
+        hashes = np.array(stored, dtype=np.uint64)
+
+        for radius in RADII:
+            cases = {
+                "near": [
+                    flip_bits(rng, rng.choice(stored), rng.randint(0, radius))
+                    for _ in range(LOOKUPS)
+                ],
+                "miss": [rng.getrandbits(64) for _ in range(LOOKUPS)],
+            }
+            for case, queries in cases.items():
+                samples = []
+                for query in queries:
+                    start = time.perf_counter()
+                    index.search(query, radius)
+                    samples.append((time.perf_counter() - start) * 1e3)
+                exact = sum(
+                    sorted(h for _, h, _ in index.search(q, radius))
+                    == brute_force(hashes, q, radius)
+                    for q in queries[:CHECKED]
+                )
+                print(
+                    f"{size:>9,} {radius:>7} {case:>6} "
+                    f"{percentile(samples, 50):>7.3f}ms "
+                    f"{percentile(samples, 99):>7.3f}ms {exact:>3}/{CHECKED}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# ============================================
+# Benchmark - Semantic Chat Cache Lookup Latency
+# ============================================
+# Run from Project_Files:  python benchmarks/bench_semantic_cache.py
+#
+# Fills a VectorIndex with N entries and times lookups of real embedded
+# queries. Bulk entries are random unit vectors so the 1M case does not
+# spend a minute in the Python embedder; a lookup costs the same either way.
+# First it prints the similarity and hit/miss of labelled query pairs:
+# paraphrases that should hit and qualified near-misses that must not.
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import semantic_cache  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+QUERIES = [
+    "Best bikes under 2 lakhs",
+    "top motorcycles below ₹2L",
+    "Compare Nexon and Brezza",
+    "Winter car maintenance tips",
+    "Best electric cars under 20 lakhs",
+    "best mileage scooter under 1 lakh",
+]
+LOOKUPS = 200
+
+# (cached query, new query, should hit) at the normal threshold
+PAIRS = [
+    ("best bikes under 2 lakh", "top motorcycles below ₹2L", True),
+    ("best bikes under 2 lakh", "best bike under 2 lakhs", True),
+    ("Winter car maintenance tips", "car maintenance tips for winter", True),
+    ("best bikes under 2 lakh", "best electric bikes under 2 lakh", False),
+    ("best bikes under 2 lakh", "best used bikes under 2 lakh", False),
+    ("best bikes under 2 lakh", "best sports bikes under 2 lakh", False),
+    ("best bikes under 2 lakh", "best bikes above 2 lakh", False),
+    ("best cars under 10 lakh", "best diesel cars under 10 lakh", False),
+    ("best cars under 10 lakh", "best automatic cars under 10 lakh", False),
+    ("best cars under 10 lakh", "best cng cars under 10 lakh", False),
+    ("best cars under 10 lakh", "best used cars under 10 lakh", False),
+    ("best cars under 10 lakh", "best cars under 12 lakh", False),
+]
+
+
+def percentile(samples, p):
+    return sorted(samples)[int(len(samples) * p / 100) - 1]
+
+
+def check_pairs():
+    """Similarity and outcome of each labelled pair; returns how many were wrong."""
+    wrong = 0
+    for cached, query, expected in PAIRS:
+        index = semantic_cache.VectorIndex(capacity=4)
+        index.add_queries([cached], [cached])
+        hit = index.search(
+            semantic_cache.embed(query),
+            semantic_cache.THRESHOLD,
+            semantic_cache.guard(query),
+        )
+        similarity = float(semantic_cache.embed(cached) @ semantic_cache.embed(query))
+        wrong += (hit is not None) != expected
+        print(
+            f"  {similarity:.3f} {'hit ' if hit else 'miss'}"
+            f" {'ok' if (hit is not None) == expected else 'WRONG'}"
+            f"  {cached!r} -> {query!r}"
+        )
+    print(f"pairs: {len(PAIRS) - wrong}/{len(PAIRS)} as expected")
+    return wrong
+
+
+def main():
+    rng = np.random.default_rng(0)
+    check_pairs()
+
+    start = time.perf_counter()
+    vectors = semantic_cache.embed_batch(QUERIES * 100)
+    embed_us = (time.perf_counter() - start) / (len(QUERIES) * 100) * 1e6
+    print(f"embed: {embed_us:.1f} us/query")
+
+    print(f"{'entries':>10} {'insert':>10} {'p50':>10} {'p99':>10}")
+    for size in SIZES:
+        index = semantic_cache.VectorIndex(capacity=size)
+        bulk = rng.standard_normal((size, semantic_cache.DIM)).astype(np.float32)
+        bulk /= np.linalg.norm(bulk, axis=1, keepdims=True)
+
+        start = time.perf_counter()
+        index.add_batch(bulk, [None] * size, [()] * size)
+        insert_s = time.perf_counter() - start
+        index.add_queries(QUERIES, QUERIES)
+
+        samples = []
+        for i in range(LOOKUPS):
+            vector = vectors[i % len(vectors)]
+            start = time.perf_counter()
+            index.search(vector, semantic_cache.THRESHOLD)
+            samples.append((time.perf_counter() - start) * 1e3)
+        print(
+            f"{size:>10,} {insert_s:>9.2f}s"
+            f" {percentile(samples, 50):>8.2f}ms {percentile(samples, 99):>8.2f}ms"
+        )
+        del index, bulk
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+# ============================================
+# AutoSage - Vectorized Vehicle Catalog
+# ============================================
+# Recommendation queries such as "Best electric cars under 20 lakhs" used
+# to leave the model to invent a shortlist every time. The catalog is a
+# columnar NumPy copy of the specs store (price min/max, mileage, fuel,
+# vehicle category): parse_filters() reads budget, fuel and vehicle type
+# from the query, search() filters and ranks every model with a handful
+# of array operations, and the top candidates go into the chat prompt so
+# the model only writes the verdict. While the model is unavailable the
+# shortlist is served on its own. The arrays are rebuilt on a background
+# thread when the store changes, so callers never wait for a rebuild.
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+import specs_kb
+from analysis_parser import parse_inr_range
+from response_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# How often other processes' writes to the specs store are looked for
+REFRESH_SECONDS = float(os.getenv("AUTOSAGE_CATALOG_REFRESH_SECONDS", "60"))
+# Longest a thread waits for the very first build
+FIRST_BUILD_TIMEOUT = 10.0
+TOP_K = 4
+
+# Fuel and vehicle category are bit flags: "Petrol / CNG" sets two bits
+FUELS = {
+    "petrol": 1,
+    "diesel": 2,
+    "electric": 4,
+    "cng": 8,
+    "hybrid": 16,
+}
+CATEGORIES = {
+    "motorcycle": 1,
+    "scooter": 2,
+    "hatchback": 4,
+    "sedan": 8,
+    "suv": 16,
+    "muv": 32,
+}
+_TWO_WHEELERS = CATEGORIES["motorcycle"] | CATEGORIES["scooter"]
+_CARS = (
+    CATEGORIES["hatchback"]
+    | CATEGORIES["sedan"]
+    | CATEGORIES["suv"]
+    | CATEGORIES["muv"]
+)
+
+# Words in specs or queries -> flags
+_FUEL_WORDS = {
+    "petrol": FUELS["petrol"],
+    "diesel": FUELS["diesel"],
+    "electric": FUELS["electric"],
+    "ev": FUELS["electric"],
+    "evs": FUELS["electric"],
+    "cng": FUELS["cng"],
+    "hybrid": FUELS["hybrid"],
+}
+_CATEGORY_WORDS = {
+    "motorcycle": CATEGORIES["motorcycle"],
+    "motorcycles": CATEGORIES["motorcycle"],
+    "bike": CATEGORIES["motorcycle"],
+    "bikes": CATEGORIES["motorcycle"],
+    "motorbike": CATEGORIES["motorcycle"],
+    "cruiser": CATEGORIES["motorcycle"],
+    "scooter": CATEGORIES["scooter"],
+    "scooters": CATEGORIES["scooter"],
+    "scooty": CATEGORIES["scooter"],
+    "hatchback": CATEGORIES["hatchback"],
+    "hatchbacks": CATEGORIES["hatchback"],
+    "sedan": CATEGORIES["sedan"],
+    "sedans": CATEGORIES["sedan"],
+    "suv": CATEGORIES["suv"],
+    "suvs": CATEGORIES["suv"],
+    "crossover": CATEGORIES["suv"],
+    "muv": CATEGORIES["muv"],
+    "muvs": CATEGORIES["muv"],
+    "mpv": CATEGORIES["muv"],
+    "car": _CARS,
+    "cars": _CARS,
+    "two-wheeler": _TWO_WHEELERS,
+    "two-wheelers": _TWO_WHEELERS,
+    "2-wheeler": _TWO_WHEELERS,
+}
+_WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)?")
+
+_UNITS = {"km/l": 0, "km/kg": 1, "km/charge": 2}
+
+
+def _flags(text, words):
+    flags = 0
+    for word in _WORD_RE.findall(text.casefold()):
+        flags |= words.get(word, 0)
+    return flags
+
+
+# ============================================
+# 1️⃣ Query Filters
+# ============================================
+
+@dataclass(slots=True)
+class Filters:
+    min_price: float = None
+    max_price: float = None
+    fuels: int = 0
+    categories: int = 0
+    # Price the buyer is aiming for ("around 10 lakh")
+    target_price: float = None
+
+    def is_empty(self):
+        return not (
+            self.min_price or self.max_price or self.target_price
+            or self.fuels or self.categories
+        )
+
+
+_AMOUNT = r"₹(\d+)"
+_MAX_RE = re.compile(
+    r"\b(?:under|below|within|upto|up to|less than|max|maximum|budget(?: of)?)\s*"
+    + _AMOUNT
+)
+_MIN_RE = re.compile(
+    r"\b(?:above|over|more than|min|minimum|from|starting)\s*" + _AMOUNT
+)
+_AROUND_RE = re.compile(rf"\b(?:around|about|approx|approximately|near)\s*{_AMOUNT}")
+_BETWEEN_RE = re.compile(
+    r"\bbetween\s+(₹?[\d.]+\s*\w*)\s+and\s+(₹\d+)|(₹\d+)\s+to\s+(₹\d+)"
+)
+_RECOMMEND_RE = re.compile(
+    r"\b(best|top|recommend\w*|suggest\w*|which|options?|good|cheapest|affordable)\b"
+)
+
+
+def parse_filters(query):
+    """Budget, fuel and vehicle type in a query; None if it has none.
+
+    Amounts are read after response_cache.normalize_query, which turns
+    "2 lakhs" and "₹2L" alike into "₹200000".
+    """
+    text = normalize_query(query)
+    filters = Filters(
+        fuels=_flags(text, _FUEL_WORDS), categories=_flags(text, _CATEGORY_WORDS)
+    )
+    between = _BETWEEN_RE.search(text)
+    if between:
+        low, high = parse_inr_range(" - ".join(g for g in between.groups() if g))
+        filters.min_price, filters.max_price = low, high
+    else:
+        if match := _MAX_RE.search(text):
+            filters.max_price = float(match.group(1))
+        if match := _MIN_RE.search(text):
+            filters.min_price = float(match.group(1))
+        if match := _AROUND_RE.search(text):
+            target = float(match.group(1))
+            filters.target_price = target
+            filters.min_price, filters.max_price = target * 0.8, target * 1.2
+
+    has_budget = filters.min_price or filters.max_price
+    if filters.is_empty() or not (has_budget or _RECOMMEND_RE.search(text)):
+        return None
+    return filters
+
+
+# ============================================
+# 2️⃣ Columnar Catalog
+# ============================================
+
+class Catalog:
+    """Specs of every known model as parallel NumPy columns."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+        def column(name):
+            return np.array([_number(row.get(name)) for row in rows], dtype=float)
+
+        self.price_min = column("price_min_inr")
+        # A missing max price is treated as the min (single-price models)
+        self.price_max = np.fmax(column("price_max_inr"), self.price_min)
+        # Midpoint, or whichever end is known
+        low, high = column("mileage_min"), column("mileage_max")
+        self.mileage = np.where(
+            np.isnan(low) | np.isnan(high), np.fmax(low, high), (low + high) / 2
+        )
+        self.unit = np.array(
+            [_UNITS.get(row.get("mileage_unit"), -1) for row in rows], dtype=np.int8
+        )
+        # Few distinct strings ("Compact SUV", "Petrol / Diesel"): flag each once
+        fuel_flags, category_flags = {}, {}
+        fuels, categories = [], []
+        for row in rows:
+            vehicle_type = row.get("vehicle_type") or ""
+            fuel_text = f"{row.get('fuel_type') or ''} {vehicle_type}"
+            if fuel_text not in fuel_flags:
+                fuel_flags[fuel_text] = _flags(fuel_text, _FUEL_WORDS)
+            if vehicle_type not in category_flags:
+                category_flags[vehicle_type] = _flags(vehicle_type, _CATEGORY_WORDS)
+            fuels.append(fuel_flags[fuel_text])
+            categories.append(category_flags[vehicle_type])
+        self.fuels = np.array(fuels, dtype=np.int32)
+        self.categories = np.array(categories, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, filters, limit=TOP_K):
+        """Indexes of the best `limit` models matching `filters`."""
+        if not len(self):
+            return []
+        mask = ~np.isnan(self.price_min)
+        if filters.max_price:
+            # Affordable if its cheapest variant is within budget
+            mask &= self.price_min <= filters.max_price
+        if filters.min_price:
+            mask &= self.price_max >= filters.min_price
+        if filters.fuels:
+            mask &= (self.fuels & filters.fuels) != 0
+        if filters.categories:
+            mask &= (self.categories & filters.categories) != 0
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        # Rank by how well the price uses the budget and by mileage, each
+        # scaled to 0-1; mileage is only compared within the same unit
+        price = self.price_min[candidates]
+        if filters.target_price:
+            price_fit = 1 - np.abs(price - filters.target_price) / filters.target_price
+        elif filters.max_price:
+            price_fit = price / filters.max_price
+        else:
+            price_fit = np.full(len(candidates), 0.5)
+        mileage = self.mileage[candidates]
+        units = self.unit[candidates]
+        mileage_fit = np.zeros(len(candidates))
+        for unit in np.unique(units[units >= 0]):
+            same = (units == unit) & ~np.isnan(mileage)
+            if same.any():
+                mileage_fit[same] = mileage[same] / mileage[same].max()
+        score = price_fit + mileage_fit
+
+        k = min(limit, len(candidates))
+        top = np.argpartition(-score, k - 1)[:k]
+        return candidates[top[np.argsort(-score[top])]].tolist()
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+_catalog = Catalog([])
+_built_version = None
+_listeners = []
+_checked_at = -np.inf
+_seen_generation = None
+_started = False
+_ready = threading.Event()
+_wakeup = threading.Event()
+_lock = threading.Lock()
+
+
+def on_refresh(fn):
+    """Call fn(catalog) on the refresher thread whenever the catalog is rebuilt."""
+    _listeners.append(fn)
+
+
+def _refresher():
+    global _catalog, _built_version
+    while True:
+        _wakeup.wait()
+        _wakeup.clear()
+        try:
+            version = specs_kb.version()
+            if version != _built_version:
+                catalog = Catalog(specs_kb.catalog_rows())
+                for fn in _listeners:
+                    fn(catalog)
+                _catalog, _built_version = catalog, version
+        except Exception:
+            logger.exception("Could not refresh the catalog")
+        finally:
+            _ready.set()
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def get():
+    """The latest built catalog; never waits for a rebuild in progress.
+
+    Until the first build finishes this is an empty catalog. Threads wait
+    up to FIRST_BUILD_TIMEOUT for that build, but an event loop thread
+    never waits.
+    """
+    global _checked_at, _seen_generation, _started
+    # Writes from this process wake the refresher at once, other processes'
+    # within REFRESH_SECONDS; it only rebuilds if the store really changed
+    generation = specs_kb.generation()
+    now = time.monotonic()
+    if generation != _seen_generation or now - _checked_at >= REFRESH_SECONDS:
+        _seen_generation, _checked_at = generation, now
+        with _lock:
+            if not _started:
+                threading.Thread(
+                    target=_refresher, name="autosage-catalog", daemon=True
+                ).start()
+                _started = True
+        _wakeup.set()
+    if not _ready.is_set() and not _on_event_loop():
+        _ready.wait(FIRST_BUILD_TIMEOUT)
+    return _catalog
+
+
+# ============================================
+# 3️⃣ Chat Integration
+# ============================================
+
+def recommend(user_query, limit=TOP_K):
+    """Catalog rows matching a recommendation query, best first."""
+    if not specs_kb.ENABLED:
+        return []
+    filters = parse_filters(user_query)
+    if filters is None:
+        return []
+    catalog = get()
+    return [catalog.rows[i] for i in catalog.search(filters, limit)]
+
+
+def describe(row):
+    return (
+        f"{row['brand']} {row['model']} - {row['price_range_inr']}"
+        f" - Mileage: {row['mileage'] or 'n/a'} - {row['fuel_type'] or 'n/a'}"
+    )
+
+
+def prompt_context(rows):
+    """Prompt section listing the shortlisted models."""
+    lines = "\n".join(f"- {describe(row)}" for row in rows)
+    return f"""
+----------------------------------------
+CANDIDATE MODELS (from the AutoSage specs catalog)
+----------------------------------------
+{lines}
+
+Recommend from these candidates, in this order unless there is a clear
+reason not to, and use their prices and mileage exactly as given. Focus
+your answer on the key features, who each suits and the verdict.
+"""
+
+
+def mentions_context(rows):
+    """Prompt section with verified facts on the vehicles a query names."""
+    lines = "\n".join(f"- {describe(row)}" for row in rows)
+    return f"""
+Verified specs of the vehicles mentioned (use these figures):
+{lines}
+"""
+
+
+def format_shortlist(rows):
+    """The shortlist as a chat answer, for when the model is unavailable."""
+    lines = [
+        f"- **{row['brand']} {row['model']}** - {row['price_range_inr']}\n"
+        f"  - Mileage: {row['mileage'] or 'n/a'}\n"
+        f"  - Fuel: {row['fuel_type'] or 'n/a'}"
+        for row in rows
+    ]
+    return "Recommended Models (from the AutoSage catalog):\n" + "\n".join(lines)
@@ -0,0 +1,147 @@
+# ============================================
+# AutoSage - Circuit Breaker For The Model Client
+# ============================================
+# When Gemini is failing or crawling, piling more calls onto it only ties
+# up worker threads and drags p99 latency up for everyone. The breaker
+# watches a sliding window of recent calls and opens once too many have
+# failed or been slow. While open, calls fail fast with CircuitOpenError
+# so the app can serve a degraded answer instead. After a cool-down it
+# lets a single probe through (half-open); if the probe is healthy the
+# circuit closes again, otherwise it re-opens.
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import retry
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The model is being shed; `retry_in` is seconds until the next probe."""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Model circuit open; next probe in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class _Call:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latency = None
+
+    def begin(self):
+        # Called once the request is really sent, so time spent queueing in
+        # our own rate limiter is not blamed on the upstream
+        self.started = time.monotonic()
+
+    def responded(self):
+        # Streams mark their first chunk; latency is time-to-first-token
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window=20,
+        min_calls=5,
+        error_rate=0.5,
+        slow_call_seconds=30.0,
+        slow_rate=0.5,
+        open_seconds=30.0,
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _trip(self, reason):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        logger.warning("Model circuit opened: %s", reason)
+
+    def before_call(self):
+        with self._lock:
+            if self.state == OPEN:
+                retry_in = self.open_seconds - (time.monotonic() - self._opened_at)
+                if retry_in > 0:
+                    raise CircuitOpenError(retry_in)
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError(0)
+                self._probing = True
+
+    def _record(self, failed, latency):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._trip("probe failed" if failed else "probe was slow")
+                else:
+                    self.state = CLOSED
+                    logger.info("Model circuit closed")
+                return
+            self._outcomes.append((failed, slow))
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slows = sum(1 for _, s in self._outcomes if s)
+            if failures / total >= self.error_rate:
+                self._trip(f"{failures}/{total} recent calls failed")
+            elif slows / total >= self.slow_rate:
+                self._trip(f"{slows}/{total} recent calls were slow")
+
+    def _release(self):
+        # The call ended without telling us anything about upstream health
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    @contextmanager
+    def guard(self):
+        """Wrap one model call; raises CircuitOpenError if it may not start."""
+        self.before_call()
+        call = _Call()
+        try:
+            yield call
+        except retry.RETRYABLE_ERRORS:
+            self._record(True, time.monotonic() - call.started)
+            raise
+        except BaseException:
+            # Bad request, blocked content or the caller going away
+            self._release()
+            raise
+        else:
+            call.responded()
+            self._record(False, call.latency)
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "window": len(self._outcomes)}
+
+
+breaker = CircuitBreaker(
+    error_rate=float(os.getenv("AUTOSAGE_BREAKER_ERROR_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("AUTOSAGE_BREAKER_SLOW_SECONDS", "30")),
+    open_seconds=float(os.getenv("AUTOSAGE_BREAKER_OPEN_SECONDS", "30")),
+)
@@ -0,0 +1,210 @@
+# ============================================
+# AutoSage - Local Vehicle Comparison
+# ============================================
+# "Compare Nexon and Brezza" used to make the model produce every price,
+# mileage and feature difference from scratch. When both vehicles are in
+# the specs store, compare() resolves the names, computes the numeric
+# deltas and feature differences locally and renders them as a table that
+# can be shown straight away; the model is only asked for pros and cons
+# and a recommendation, from a much shorter prompt.
+
+import re
+from dataclasses import dataclass
+
+import name_resolver
+import specs_kb
+
+# "compare X and Y", "X vs Y", "difference between X and Y", "X or Y"
+_COMPARE_RE = re.compile(
+    r"^(?:please\s+)?(?:compare|comparison\s+(?:of|between)|difference\s+between)"
+    r"\s+(?P<names>.+)$"
+    r"|^(?P<left>.+?)\s+(?:vs\.?|versus|or|better than|compared to)\s+(?P<right>.+)$",
+    re.IGNORECASE,
+)
+_SPLIT_RE = re.compile(r"\s*(?:,|\band\b|\bwith\b|\bvs\.?|\bversus\b|&)\s*", re.I)
+_FILLER_RE = re.compile(
+    r"\b(?:the|which is better|which one|is better|for me|in india|\?)\b|[?!.]+",
+    re.IGNORECASE,
+)
+
+
+# ============================================
+# 1️⃣ Finding The Vehicles In A Query
+# ============================================
+
+def extract_names(user_query):
+    """Vehicle names in a comparison query, e.g. ["Nexon", "Brezza"]."""
+    match = _COMPARE_RE.match(user_query.strip())
+    if match is None:
+        return []
+    if match.group("names"):
+        parts = _SPLIT_RE.split(match.group("names"))
+    else:
+        parts = [match.group("left"), *_SPLIT_RE.split(match.group("right"))]
+    names = [_FILLER_RE.sub(" ", part).strip(" ,;:") for part in parts]
+    return [name for name in names if name]
+
+
+def resolve(name):
+    """The specs_kb key of the catalog vehicle `name` refers to, or None."""
+    match = name_resolver.resolve(name)
+    return None if match is None else match.key
+
+
+# ============================================
+# 2️⃣ Numeric Deltas And Feature Differences
+# ============================================
+
+@dataclass(slots=True)
+class Comparison:
+    vehicles: list
+    table: str
+
+    def names(self):
+        return [f"{row['brand']} {row['model']}" for row in self.vehicles]
+
+
+def _lakh(amount):
+    return f"₹{amount / 100_000:.2f} lakh"
+
+
+def _price_delta(first, second):
+    if first["price_min_inr"] is None or second["price_min_inr"] is None:
+        return ""
+    delta = second["price_min_inr"] - first["price_min_inr"]
+    if not delta:
+        return "same starting price"
+    cheaper = first if delta > 0 else second
+    return f"{cheaper['model']} starts {_lakh(abs(delta))} cheaper"
+
+
+def _mileage_delta(first, second):
+    if (
+        first["mileage_min"] is None
+        or second["mileage_min"] is None
+        or first["mileage_unit"] != second["mileage_unit"]
+    ):
+        return ""
+
+    def mid(row):
+        return (row["mileage_min"] + (row["mileage_max"] or row["mileage_min"])) / 2
+
+    delta = mid(first) - mid(second)
+    if abs(delta) < 0.05:
+        return "about the same"
+    better = first if delta > 0 else second
+    return f"{better['model']} +{abs(delta):.1f} {first['mileage_unit']}"
+
+
+def _engine_delta(first, second):
+    if first["engine_cc"] is None or second["engine_cc"] is None:
+        return ""
+    delta = first["engine_cc"] - second["engine_cc"]
+    if not delta:
+        return "same displacement"
+    bigger = first if delta > 0 else second
+    return f"{bigger['model']} +{abs(delta)} cc"
+
+
+def _feature_lines(vehicles, name, title):
+    # Features are free text; compare them case-insensitively
+    sets = [{f.casefold(): f for f in row[name]} for row in vehicles]
+    common = set.intersection(*(set(s) for s in sets))
+    lines = []
+    if common:
+        shared = ", ".join(sets[0][f] for f in sorted(common))
+        lines.append(f"- **{title} in common:** {shared}")
+    for row, features in zip(vehicles, sets):
+        only = [features[f] for f in sorted(features) if f not in common]
+        if only:
+            lines.append(f"- **{title} only on {row['model']}:** {', '.join(only)}")
+    return lines
+
+
+def _cell(value):
+    return (value or "—").replace("|", "/")
+
+
+def render_table(vehicles):
+    """Markdown comparison table plus feature differences."""
+    header = "| | " + " | ".join(f"{r['brand']} {r['model']}" for r in vehicles)
+    two = len(vehicles) == 2
+    if two:
+        header += " | Difference"
+    lines = [header + " |", "|---" * (len(vehicles) + 1 + two) + "|"]
+    rows = [
+        ("Price (INR)", "price_range_inr", _price_delta),
+        ("Mileage", "mileage", _mileage_delta),
+        ("Engine", "engine_capacity", _engine_delta),
+        ("Fuel", "fuel_type", None),
+        ("Type", "vehicle_type", None),
+        ("Transmission", "transmission", None),
+        ("Power", "power_output", None),
+        ("Torque", "torque", None),
+        ("Maintenance", "maintenance_level", None),
+        ("Launched", "launch_year", None),
+    ]
+    for title, name, delta in rows:
+        cells = [_cell(row[name]) for row in vehicles]
+        if two:
+            cells.append(_cell(delta(*vehicles) if delta else ""))
+        lines.append(f"| {title} | " + " | ".join(cells) + " |")
+    lines.append("")
+    lines += _feature_lines(vehicles, "special_features", "Features")
+    lines += _feature_lines(vehicles, "safety_features", "Safety")
+    return "\n".join(lines).rstrip()
+
+
+def compare(user_query):
+    """A Comparison when every vehicle named is in the store, else None."""
+    if not specs_kb.ENABLED:
+        return None
+    names = extract_names(user_query)
+    if len(names) < 2:
+        return None
+    vehicles = []
+    for name in names:
+        key = resolve(name)
+        row = specs_kb.get(key) if key else None
+        if row is None or any(v["key"] == key for v in vehicles):
+            return None
+        vehicles.append(row)
+    return Comparison(vehicles, render_table(vehicles))
+
+
+# ============================================
+# 3️⃣ Prompt For The Open-Ended Part
+# ============================================
+
+def _brief(row):
+    facts = [
+        row["price_range_inr"],
+        row["mileage"],
+        row["engine_capacity"],
+        row["fuel_type"],
+        ", ".join(row["special_features"]),
+        ", ".join(row["safety_features"]),
+    ]
+    return f"- {row['brand']} {row['model']}: " + "; ".join(f for f in facts if f)
+
+
+def build_prompt(user_query, comparison):
+    # The user already sees the table, so the model gets the facts in
+    # brief and writes only the judgement
+    briefs = "\n".join(_brief(row) for row in comparison.vehicles)
+    return f"""
+You are AutoSage, an expert automotive advisor for the Indian market.
+
+User Query:
+{user_query}
+
+Verified specs (price; mileage; engine; fuel; features; safety), already shown to the user as a table:
+{briefs}
+
+Do NOT repeat the specs or restate their numbers. Write only:
+
+Pros & Cons:
+- 2 pros and 2 cons for each of {", ".join(comparison.names())}
+
+Recommendation: Which one to choose and for what type of buyer (2-3 lines).
+"""
@@ -0,0 +1,112 @@
+# ============================================
+# AutoSage - Image Preprocessing
+# ============================================
+# Phone photos arrive as multi-megabyte, full-resolution files with EXIF
+# metadata. Gemini does not need more than ~1.5k pixels to identify a
+# vehicle, so before building the request payload we rotate the image
+# upright, shrink it, drop all metadata and re-encode it compactly.
+
+import io
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+MAX_DIMENSION = int(os.getenv("AUTOSAGE_IMAGE_MAX_DIM", "1536"))
+OUTPUT_FORMAT = os.getenv("AUTOSAGE_IMAGE_FORMAT", "JPEG").upper()
+QUALITY = int(os.getenv("AUTOSAGE_IMAGE_QUALITY", "85"))
+# Clean JPEG/WebP files up to this size and MAX_DIMENSION are sent as they
+# are, so a payload that was already prepared is not re-encoded again
+PASSTHROUGH_BYTES = int(os.getenv("AUTOSAGE_IMAGE_PASSTHROUGH_BYTES", "1048576"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+def _flatten(image):
+    # JPEG has no alpha channel; paint transparent areas white
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def prepare_image(
+    data, max_dimension=MAX_DIMENSION, output_format=OUTPUT_FORMAT, quality=QUALITY
+):
+    """Decode once; return (upright RGB image, payload bytes, mime_type).
+
+    The payload is a downscaled, metadata-free re-encode of the image.
+    """
+    if output_format not in MIME_TYPES:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    image = Image.open(io.BytesIO(data))
+    source_mime = Image.MIME.get(image.format)
+    original_size = image.size
+    has_metadata = bool(image.getexif()) or "icc_profile" in image.info
+    if (
+        source_mime in MIME_TYPES.values()
+        and image.mode == "RGB"
+        and not has_metadata
+        and len(data) <= PASSTHROUGH_BYTES
+        and (not max_dimension or max(original_size) <= max_dimension)
+    ):
+        # Already upright, small and metadata-free (e.g. prepared by the
+        # thin client): another lossy re-encode would only cost quality
+        logger.info("Image %dx%d passed through as is", *original_size)
+        return image.convert("RGB"), data, source_mime
+    if max_dimension:
+        # JPEG can decode straight at a reduced scale, skipping most of the work
+        image.draft("RGB", (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image)
+    if max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    image = _flatten(image)
+
+    out = io.BytesIO()
+    # Saving without exif=/icc_profile= leaves all metadata behind
+    image.save(out, format=output_format, quality=quality, optimize=True)
+    processed = out.getvalue()
+    mime_type = MIME_TYPES[output_format]
+
+    if (
+        len(processed) >= len(data)
+        and image.size == original_size
+        and not has_metadata
+        and source_mime in MIME_TYPES.values()
+    ):
+        # Already small, clean and upright: re-encoding would only grow it
+        processed, mime_type = data, source_mime
+
+    logger.info(
+        "Preprocessed image %dx%d: %d -> %d bytes (%d saved)",
+        image.width,
+        image.height,
+        len(data),
+        len(processed),
+        len(data) - len(processed),
+    )
+    return image, processed, mime_type
+
+
+def preprocess_image(
+    data, max_dimension=MAX_DIMENSION, output_format=OUTPUT_FORMAT, quality=QUALITY
+):
+    """Return (bytes, mime_type) of an upright, downscaled, metadata-free copy."""
+    _, processed, mime_type = prepare_image(
+        data, max_dimension, output_format, quality
+    )
+    return processed, mime_type
+
+
+def make_thumbnail(image, max_dimension, quality=80):
+    """JPEG bytes of a display-sized copy of an already decoded image."""
+    thumbnail = image.copy()
+    thumbnail.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    thumbnail.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
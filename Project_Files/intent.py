@@ -0,0 +1,95 @@
+# ============================================
+# AutoSage - Chat Query Intent Classifier
+# ============================================
+# build_prompt() spells out the answer structure for all four kinds of
+# question (buying, comparison, maintenance, eco-friendly) on every call,
+# so each query pays input tokens for three sections it does not use.
+# classify() is a tiny hand-weighted linear model over query words plus a
+# few pattern features; it picks the one section to send. Queries it is
+# not sure about (low or close scores) get the full template as before.
+
+import re
+
+from response_cache import normalize_query
+
+BUYING = "buying"
+COMPARISON = "comparison"
+MAINTENANCE = "maintenance"
+ECO = "eco"
+INTENTS = (BUYING, COMPARISON, MAINTENANCE, ECO)
+
+# Below this score, or this close to the runner-up, the query is ambiguous
+MIN_SCORE = 1.5
+MIN_MARGIN = 0.75
+
+_WORDS = {
+    BUYING: {
+        "best": 1.0, "buy": 1.5, "buying": 1.5, "purchase": 1.5,
+        "recommend": 1.5, "recommendation": 1.5, "suggest": 1.5,
+        "suggestion": 1.5, "which": 0.5, "top": 1.0, "options": 1.0,
+        "affordable": 1.0, "cheapest": 1.0, "budget": 1.5, "under": 1.0,
+        "below": 1.0, "first": 0.5, "family": 0.5, "worth": 1.0,
+        "should": 0.5,
+    },
+    COMPARISON: {
+        "compare": 3.5, "comparison": 3.5, "vs": 3.5, "versus": 3.5,
+        "difference": 2.0, "differences": 2.0, "better": 1.0, "or": 0.5,
+        "between": 1.0,
+    },
+    MAINTENANCE: {
+        "maintenance": 3.0, "maintain": 3.0, "service": 2.0,
+        "servicing": 2.5, "tips": 1.5, "tip": 1.5, "care": 1.5,
+        "tyre": 2.0, "tyres": 2.0, "tire": 2.0, "tires": 2.0, "oil": 2.0,
+        "brake": 2.0, "brakes": 2.0, "clutch": 2.0, "coolant": 2.0,
+        "chain": 1.5, "wash": 1.5, "clean": 1.5, "cleaning": 1.5,
+        "winter": 1.5, "summer": 1.5, "monsoon": 1.5, "rainy": 1.5,
+        "check": 1.0, "checks": 1.0, "problem": 1.5, "noise": 1.5,
+        "repair": 2.0, "battery": 0.5, "warning": 1.0, "filter": 1.5,
+    },
+    ECO: {
+        "electric": 2.5, "ev": 2.5, "evs": 2.5, "hybrid": 2.5, "eco": 3.0,
+        "green": 1.5, "charging": 2.5, "charge": 1.5, "charger": 2.5,
+        "range": 1.0, "emission": 2.0, "emissions": 2.0, "cng": 1.0,
+        "subsidy": 2.5, "subsidies": 2.5, "incentive": 2.5,
+        "incentives": 2.5, "fame": 1.5, "environment": 2.5,
+        "sustainable": 2.5, "pollution": 2.0,
+    },
+}
+_WORD_RE = re.compile(r"[a-z]+")
+
+# (pattern, intent, weight) over the normalized query
+_PATTERNS = [
+    # A budget: normalize_query turns "2 lakhs" into "₹200000"
+    (re.compile(r"₹\d+"), BUYING, 1.5),
+    (re.compile(r"\bbetter than\b"), COMPARISON, 1.0),
+    # A bare "activa or jupiter"
+    (re.compile(r"^\S+(?: \S+)? or \S+(?: \S+)?$"), COMPARISON, 1.5),
+    (re.compile(r"\beco[- ]friendly\b|\bzero emission"), ECO, 2.0),
+    (re.compile(r"\bhow (?:often|to|do i)\b"), MAINTENANCE, 1.0),
+]
+
+
+def scores(user_query):
+    """Score per intent for a query; higher means more likely."""
+    text = normalize_query(user_query)
+    totals = dict.fromkeys(INTENTS, 0.0)
+    for word in set(_WORD_RE.findall(text)):
+        for intent_name, weights in _WORDS.items():
+            totals[intent_name] += weights.get(word, 0.0)
+    for pattern, intent_name, weight in _PATTERNS:
+        if pattern.search(text):
+            totals[intent_name] += weight
+    # Eco-friendly buying questions ("best electric cars under 20 lakhs")
+    # want the EV section, which has its own shortlist layout
+    if totals[ECO] >= 2.5 and totals[BUYING] > totals[COMPARISON]:
+        totals[ECO] += totals[BUYING]
+    return totals
+
+
+def classify(user_query):
+    """The query's intent, or None when it is unclear (use the full prompt)."""
+    ranked = sorted(scores(user_query).items(), key=lambda item: -item[1])
+    (best, top), (_, runner_up) = ranked[0], ranked[1]
+    if top < MIN_SCORE or top - runner_up < MIN_MARGIN:
+        return None
+    return best
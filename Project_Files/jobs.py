@@ -0,0 +1,326 @@
+# ============================================
+# AutoSage - Background Analysis Jobs
+# ============================================
+# "Analyze Vehicle" used to run inline in the Streamlit script, so the
+# work died with the websocket and blocked every other widget in the
+# session until it finished. Analyses are now jobs: submit() stores the
+# image in an on-disk SQLite job store and returns a job id at once, and
+# a small pool of worker threads picks jobs up. Workers stream the answer
+# into the store as it arrives, so a page polling get() still sees the
+# text grow. Finished results stay in the store for a retention period
+# (workers purge older ones hourly), so a reloaded page can show them
+# again by job id.
+#
+# Several app processes may share one store: jobs are claimed with a
+# single UPDATE, and a job whose worker died is picked up again once its
+# lease runs out. Transient model errors requeue a job with a growing
+# delay; a job is failed for good after MAX_ATTEMPTS claims.
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import circuit_breaker
+import rate_limit
+import retry
+import routing
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DB_PATH = os.getenv(
+    "AUTOSAGE_JOB_DB", str(Path(__file__).parent / ".autosage_jobs.sqlite3")
+)
+WORKERS = int(os.getenv("AUTOSAGE_JOB_WORKERS", "4"))
+# A running job not updated for this long is assumed orphaned and re-run
+LEASE_SECONDS = float(os.getenv("AUTOSAGE_JOB_LEASE_SECONDS", "300"))
+MAX_ATTEMPTS = 3
+# A requeued job waits this long before its next attempt, doubling each time
+REQUEUE_DELAY = float(os.getenv("AUTOSAGE_JOB_REQUEUE_DELAY", "10"))
+REQUEUE_MAX_DELAY = 300.0
+# Finished jobs are deleted after this long
+RETENTION_SECONDS = float(os.getenv("AUTOSAGE_JOB_RETENTION_DAYS", "7")) * 86400
+# How often a worker deletes expired jobs
+PURGE_SECONDS = 3600.0
+# How often partial output is written while a job streams
+PROGRESS_SECONDS = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    session TEXT,
+    name TEXT,
+    mime_type TEXT,
+    input BLOB,
+    result TEXT,
+    error TEXT,
+    degraded INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session, created);
+"""
+
+# Columns returned by get(); the input image is left out
+_FIELDS = (
+    "id, kind, status, session, name, result, error, degraded, attempts, "
+    "created, updated, finished"
+)
+
+_local = threading.local()
+_wakeup = threading.Event()
+_started = False
+_purged_at = 0.0
+_lock = threading.Lock()
+
+
+# ============================================
+# 1️⃣ SQLite Job Store
+# ============================================
+
+def _db():
+    # One connection per thread; WAL lets readers poll while workers write
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "not_before" not in columns:
+            # Stores created before requeue backoff existed
+            conn.execute(
+                "ALTER TABLE jobs ADD COLUMN not_before REAL NOT NULL DEFAULT 0"
+            )
+        _local.conn = conn
+    return conn
+
+
+def submit(image_data, session=None, name=None):
+    """Queue an image analysis and return its job id."""
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    _db().execute(
+        "INSERT INTO jobs (id, kind, status, session, name, mime_type, input,"
+        " created, updated) VALUES (?, 'image', ?, ?, ?, ?, ?, ?, ?)",
+        (
+            job_id,
+            QUEUED,
+            session,
+            name,
+            image_data["mime_type"],
+            image_data["data"],
+            now,
+            now,
+        ),
+    )
+    _wakeup.set()
+    return job_id
+
+
+def get(job_id):
+    """The job as a dict (result holds partial text while running), or None."""
+    row = _db().execute(
+        f"SELECT {_FIELDS} FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def list_jobs(session, limit=20):
+    rows = _db().execute(
+        f"SELECT {_FIELDS} FROM jobs WHERE session = ? ORDER BY created DESC LIMIT ?",
+        (session, limit),
+    )
+    return [dict(row) for row in rows]
+
+
+def stats():
+    rows = _db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+    return dict(rows.fetchall())
+
+
+def _expire_orphans(now):
+    # A job whose worker died on every attempt (an input that crashes the
+    # process, say) would otherwise be reclaimed forever
+    _db().execute(
+        "UPDATE jobs SET status = ?, error = 'too_many_attempts', input = NULL,"
+        " updated = ?, finished = ?"
+        " WHERE status = ? AND updated < ? AND attempts >= ?",
+        (FAILED, now, now, RUNNING, now - LEASE_SECONDS, MAX_ATTEMPTS),
+    )
+
+
+def _claim():
+    # Atomic across threads and processes: whoever updates the row owns it
+    now = time.time()
+    _expire_orphans(now)
+    return _db().execute(
+        "UPDATE jobs SET status = ?, attempts = attempts + 1, updated = ?"
+        " WHERE id = (SELECT id FROM jobs"
+        "   WHERE ((status = ? AND not_before <= ?)"
+        "     OR (status = ? AND updated < ?)) AND attempts < ?"
+        "   ORDER BY created LIMIT 1)"
+        " RETURNING id, session, mime_type, input, attempts",
+        (
+            RUNNING,
+            now,
+            QUEUED,
+            now,
+            RUNNING,
+            now - LEASE_SECONDS,
+            MAX_ATTEMPTS,
+        ),
+    ).fetchone()
+
+
+def _progress(job_id, text):
+    _db().execute(
+        "UPDATE jobs SET result = ?, updated = ? WHERE id = ?",
+        (text, time.time(), job_id),
+    )
+
+
+def _requeue(job_id, delay):
+    now = time.time()
+    _db().execute(
+        "UPDATE jobs SET status = ?, result = NULL, updated = ?, not_before = ?"
+        " WHERE id = ?",
+        (QUEUED, now, now + delay, job_id),
+    )
+
+
+def _requeue_delay(exc, attempts):
+    delay = min(REQUEUE_MAX_DELAY, REQUEUE_DELAY * 2 ** (attempts - 1))
+    hint = retry.retry_after(exc)
+    return delay if hint is None else max(delay, hint)
+
+
+def _finish(job_id, status, result=None, error=None, degraded=False):
+    now = time.time()
+    # The image is only needed until the job is done
+    _db().execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, degraded = ?,"
+        " input = NULL, updated = ?, finished = ? WHERE id = ?",
+        (status, result, error, int(degraded), now, now, job_id),
+    )
+
+
+def _purge():
+    _db().execute(
+        "DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+        (time.time() - RETENTION_SECONDS,),
+    )
+
+
+def _purge_due():
+    # One worker per PURGE_SECONDS does the purge
+    global _purged_at
+    now = time.monotonic()
+    with _lock:
+        if _purged_at and now - _purged_at < PURGE_SECONDS:
+            return False
+        _purged_at = now
+    return True
+
+
+# ============================================
+# 2️⃣ Worker Pool
+# ============================================
+
+def _run_job(job, stream_fn, degraded_fn, model_errors):
+    image_data = {"mime_type": job["mime_type"], "data": job["input"]}
+    # Queue fairly against live sessions under the submitter's session
+    rate_limit.current_session.set(job["session"] or "background")
+    chunks = []
+    last_write = 0.0
+    try:
+        for chunk in stream_fn(image_data):
+            if chunk is routing.RESTART:
+                chunks.clear()
+            else:
+                chunks.append(chunk)
+            if time.monotonic() - last_write >= PROGRESS_SECONDS:
+                _progress(job["id"], "".join(chunks))
+                last_write = time.monotonic()
+    except circuit_breaker.CircuitOpenError:
+        result = degraded_fn(image_data)
+        if result is None:
+            _finish(job["id"], FAILED, error="circuit_open")
+        else:
+            _finish(job["id"], DONE, result, degraded=True)
+    except model_errors as exc:
+        if job["attempts"] < MAX_ATTEMPTS:
+            delay = _requeue_delay(exc, job["attempts"])
+            logger.warning(
+                "Job %s failed (%s); retrying in %.0fs", job["id"], exc, delay
+            )
+            _requeue(job["id"], delay)
+        else:
+            _finish(job["id"], FAILED, error=type(exc).__name__)
+    except retry.MODEL_ERRORS as exc:
+        # Not transient (a rejected request, say): retrying cannot help
+        logger.warning("Job %s failed (%s)", job["id"], exc)
+        _finish(job["id"], FAILED, error=type(exc).__name__)
+    else:
+        _finish(job["id"], DONE, "".join(chunks))
+
+
+def _worker(stream_fn, degraded_fn, model_errors):
+    while True:
+        # Cleared before looking, so a submit() racing with us is not missed
+        _wakeup.clear()
+        try:
+            if _purge_due():
+                _purge()
+            job = _claim()
+        except sqlite3.Error:
+            logger.exception("Could not read the job store")
+            job = None
+        if job is None:
+            # Poll now and then too, for jobs submitted by other processes
+            _wakeup.wait(5)
+            continue
+        try:
+            _run_job(job, stream_fn, degraded_fn, model_errors)
+        except Exception as exc:
+            logger.exception("Job %s crashed", job["id"])
+            _finish(job["id"], FAILED, error=type(exc).__name__)
+
+
+def start(stream_fn, degraded_fn, model_errors):
+    """Start the worker pool; only the first call per process does anything.
+
+    stream_fn(image_data) yields the analysis chunk by chunk (and
+    routing.RESTART), degraded_fn(image_data) returns a fallback answer or
+    None while the circuit is open, and model_errors are the transient
+    exceptions worth retrying the job for (e.g. retry.RETRYABLE_ERRORS);
+    anything else fails the job at once.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    for i in range(WORKERS):
+        threading.Thread(
+            target=_worker,
+            args=(stream_fn, degraded_fn, model_errors),
+            name=f"autosage-job-{i}",
+            daemon=True,
+        ).start()
+    return True
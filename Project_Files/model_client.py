@@ -0,0 +1,64 @@
+# ============================================
+# AutoSage - Shared Gemini Model Client
+# ============================================
+# genai.configure() throws away the SDK's client pool, and the app used to
+# call it (and build a fresh GenerativeModel) on every Streamlit rerun, so
+# each request paid for a new transport and TLS handshake. This module is
+# imported once per process, so everything in it is shared by all sessions.
+
+import json
+import threading
+
+import google.generativeai as genai
+
+DEFAULT_MODEL = "models/gemini-2.5-flash"
+
+_lock = threading.Lock()
+_configured_key = None
+_models = {}
+
+
+def configure(api_key):
+    """Configure the Gemini SDK once; later calls with the same key are no-ops."""
+    global _configured_key
+    with _lock:
+        if _configured_key == api_key and _configured_key is not None:
+            return
+        genai.configure(api_key=api_key)
+        _configured_key = api_key
+        # Models hold on to the old transport, so drop them with it.
+        _models.clear()
+
+
+def _config_key(generation_config):
+    if generation_config is None:
+        return None
+    if isinstance(generation_config, dict):
+        return json.dumps(generation_config, sort_keys=True, default=str)
+    return repr(generation_config)
+
+
+def get_model(model_name=DEFAULT_MODEL, generation_config=None):
+    """Return the process-wide model for (model_name, generation_config)."""
+    key = (model_name, _config_key(generation_config))
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    model_name, generation_config=generation_config
+                )
+                _models[key] = model
+    return model
+
+
+def _usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", 0) if usage else 0
+
+
+def _request_options(timeout):
+    # retry=None switches off the SDK's built-in 600s retry on 503s;
+    # retry.RetryPolicy is the only retry layer.
+    return {"timeout": max(timeout, 1.0), "retry": None}
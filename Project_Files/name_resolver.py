@@ -0,0 +1,416 @@
+# ============================================
+# AutoSage - Vehicle Name Resolver
+# ============================================
+# Maps free text ("brezza", "Maruti Vitara Brezza", "tata nexon ev max",
+# "xuv 700") to the catalog's canonical vehicles. Every vehicle gets a set
+# of aliases (brand + model, model alone, brand short forms and the
+# distinctive parts of multi-word model names) in an exact-match hash;
+# misspellings fall through to a character-trigram index whose posting
+# lists are NumPy arrays, so a fuzzy lookup is one bincount over the
+# candidate aliases rather than a scan.
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+import catalog
+from response_cache import normalize_query
+
+# Fuzzy matches need at least this Dice similarity of character trigrams
+FUZZY_THRESHOLD = float(os.getenv("AUTOSAGE_NAME_FUZZY_THRESHOLD", "0.6"))
+# ...or this much and a single-letter slip in a word of 5+ letters: one
+# wrong letter costs a short name half its trigrams ("brezaa" is 0.5)
+ONE_EDIT_THRESHOLD = 0.4
+# Stricter for names spotted inside free text
+MENTION_THRESHOLD = 0.75
+# Longest run of words tried as one name when scanning a query
+MAX_SPAN = 4
+
+# Short forms buyers use for brands, in tokenized form
+BRAND_ALIASES = {
+    "maruti suzuki": ["maruti", "suzuki"],
+    "mahindra": ["mahindra and mahindra", "m and m"],
+    "tata": ["tata motors"],
+    "hyundai": ["hyundai motor"],
+    "volkswagen": ["vw"],
+    "mercedes benz": ["mercedes", "benz"],
+    "royal enfield": ["enfield"],
+    "hero": ["hero motocorp"],
+    "hero motocorp": ["hero"],
+    "honda": ["honda motorcycle", "hmsi"],
+    "bajaj": ["bajaj auto"],
+}
+_SYNONYMS = {"electric": "ev", "plus": "+"}
+# Words that make a different vehicle: a fuzzy match must agree on these
+# and on every number ("nexon ev" is not the Nexon, "classic 500" not the
+# Classic 350)
+_VARIANTS = {"ev", "max", "pro", "+", "cng", "hybrid", "turbo", "diesel", "petrol"}
+# Words that never absorb a number across a space ("is 500" is not
+# "is500"); written together ("a4", "i20") they still do
+_STOPWORDS = {
+    "a", "an", "is", "it", "to", "on", "at", "by", "as", "be", "do",
+    "if", "so", "no", "my", "me", "we", "us", "km", "kg", "cc", "hp", "rs",
+}
+# Words that never make a name on their own
+_GENERIC = {
+    "the", "and", "vs", "or", "car", "cars", "bike", "bikes", "scooter", "new",
+    "price", "mileage", "model", "best", "compare", "with", "for", "in", "of",
+    "ev", "max", "pro", "plus", "+", "top", "base", "variant", "diesel",
+    "petrol", "cng", "automatic", "manual", "under", "lakh", "lakhs",
+}
+
+# Words in any script: re's \w leaves out combining marks, which Indic
+# scripts need inside words ("इलेक्ट्रिक"), so those blocks are added
+# (without their digits and danda punctuation)
+_LETTER = r"[^\W\d_]|(?!\d)[\u0300-\u036f\u0900-\u0963\u0966-\u0dff]"
+_TOKEN_RE = re.compile(rf"(?:{_LETTER})+|\d+(?:\.\d+)?|\+")
+# canonical_query() falls back to the plain normalized query when tokens
+# cover less than this share of its characters
+MIN_TOKEN_COVERAGE = 0.5
+_YEAR_RE = re.compile(r"^(?:19|20)\d\d$")
+
+
+# ============================================
+# 1️⃣ Tokenization For Indian Model Names
+# ============================================
+
+def tokenize(text):
+    """Name tokens; "XUV 700", "xuv-700" and "XUV700" all give ["xuv700"].
+
+    Short letter prefixes absorb the number after them (i20, ns200,
+    xuv700) and bare numbers absorb a short letter suffix (6g), while
+    long words and model years stay separate (classic 350, swift 2023).
+    """
+    tokens = []
+    end = None
+    for match in _TOKEN_RE.finditer(text.casefold().replace("&", " and ")):
+        token = _SYNONYMS.get(match.group(), match.group())
+        glued = match.start() == end
+        end = match.end()
+        if tokens:
+            last = tokens[-1]
+            if (
+                token[0].isdigit()
+                and last.isalpha()
+                and len(last) <= 3
+                and last not in _GENERIC
+                and (glued or last not in _STOPWORDS)
+                and not _YEAR_RE.match(token)
+            ):
+                tokens[-1] = last + token
+                continue
+            if token.isalpha() and len(token) <= 2 and last.isdigit():
+                if not _YEAR_RE.match(last) and (glued or token not in _STOPWORDS):
+                    tokens[-1] = last + token
+                    continue
+        tokens.append(token)
+    return tokens
+
+
+def _variant_words(words):
+    # Numbers only by their digits, so "nns570" is still the NS570
+    return {w for w in words if w in _VARIANTS} | {
+        digits for w in words if (digits := re.sub(r"\D", "", w))
+    }
+
+
+def _same_variant(words, alias_words):
+    # An extra word ("swift dzire" for the Swift) is another model; a typo
+    # that splits one ("xuvv 835") only moves the letters around
+    if len(words) != len(alias_words):
+        if abs(sum(map(len, words)) - sum(map(len, alias_words))) > 2:
+            return False
+    return _variant_words(words) == _variant_words(alias_words)
+
+
+def _one_edit(a, b):
+    # One wrong, extra, missing or swapped letter after a shared first one
+    if a[:1] != b[:1] or abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (
+        a[i:i + 2] == b[i + 1:i - 1:-1] and a[i + 2:] == b[i + 2:]
+    )
+
+
+def _trigrams(alias):
+    padded = f" {alias} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ============================================
+# 2️⃣ Alias Index
+# ============================================
+
+@dataclass(slots=True)
+class Match:
+    key: str
+    brand: str
+    model: str
+    score: float
+    # The text that matched, e.g. "brezza" in "compare nexon and brezza"
+    text: str = ""
+
+    @property
+    def name(self):
+        return f"{self.brand} {self.model}"
+
+
+# Alias ranks: lower wins when two vehicles claim the same alias
+_FULL, _MODEL, _PARTIAL = 0, 1, 2
+
+
+class NameIndex:
+    def __init__(self, vehicles):
+        """vehicles: (key, brand, model) tuples."""
+        self.vehicles = []
+        self._exact = {}  # alias -> (rank, name length, vehicle index)
+        self._shared = set()  # partial aliases claimed by several vehicles
+        self.brands = set()
+        for key, brand, model in vehicles:
+            self._add(key, brand, model)
+        # "classic" is both the Classic 350 and the Classic 500: neither,
+        # and no fuzzy guess either
+        self._ambiguous = {a for a in self._shared if self._exact[a][0] == _PARTIAL}
+        for alias in self._ambiguous:
+            del self._exact[alias]
+
+        self.aliases = list(self._exact)
+        self._alias_vehicle = np.array(
+            [self._exact[alias][2] for alias in self.aliases], dtype=np.int32
+        )
+        postings = {}
+        sizes = np.zeros(len(self.aliases), dtype=np.float32)
+        for i, alias in enumerate(self.aliases):
+            grams = _trigrams(alias)
+            sizes[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {
+            gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()
+        }
+        self._sizes = sizes
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def _claim(self, alias, rank, vehicle):
+        if not alias:
+            return
+        # Ties go to the shorter name: "nexon ev" is the Nexon EV, not the
+        # Nexon EV Max
+        claim = (rank, len(self.vehicles[vehicle][2]), vehicle)
+        current = self._exact.get(alias)
+        if rank == _PARTIAL and current is not None and current[2] != vehicle:
+            self._shared.add(alias)
+        if current is None or claim < current:
+            self._exact[alias] = claim
+
+    def _add(self, key, brand, model):
+        vehicle = len(self.vehicles)
+        self.vehicles.append((key, brand, model))
+        brand_tokens = tokenize(brand)
+        model_tokens = tokenize(model)
+        # Models often repeat the brand ("Tata Nexon")
+        if model_tokens[: len(brand_tokens)] == brand_tokens:
+            model_tokens = model_tokens[len(brand_tokens):] or model_tokens
+        brand_name = " ".join(brand_tokens)
+        model_name = " ".join(model_tokens)
+        brand_names = [brand_name, *BRAND_ALIASES.get(brand_name, [])]
+        self.brands.update(brand_names)
+
+        for name in brand_names:
+            self._claim(f"{name} {model_name}".strip(), _FULL, vehicle)
+        self._claim(model_name, _MODEL, vehicle)
+        # Distinctive parts of longer names: "brezza" for "vitara brezza"
+        n = len(model_tokens)
+        for size in range(n - 1, 0, -1):
+            for start in range(n - size + 1):
+                span = model_tokens[start:start + size]
+                # A bare number ("350") names no model on its own
+                if all(t in _GENERIC or len(t) < 3 or t[0].isdigit() for t in span):
+                    continue
+                part = " ".join(span)
+                self._claim(part, _PARTIAL, vehicle)
+                self._claim(f"{brand_name} {part}", _PARTIAL, vehicle)
+
+    def _match(self, vehicle, score, text):
+        key, brand, model = self.vehicles[vehicle]
+        return Match(key, brand, model, score, text)
+
+    def exact(self, tokens):
+        claim = self._exact.get(" ".join(tokens))
+        return None if claim is None else claim[2]
+
+    def fuzzy(self, alias, threshold=None, candidates=8):
+        """(vehicle index, similarity) of the closest compatible alias, or None.
+
+        Compatible means a misspelling of it: no extra or missing words,
+        and the same numbers and variant words. Below `threshold`, a
+        single-letter slip in a word of 5+ letters still counts.
+        """
+        threshold = FUZZY_THRESHOLD if threshold is None else threshold
+        grams = _trigrams(alias)
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists:
+            return None
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.aliases))
+        dice = 2 * counts / (len(grams) + self._sizes)
+        k = min(candidates, len(dice))
+        top = np.argpartition(-dice, k - 1)[:k]
+        words = alias.split()
+        for best in top[np.argsort(-dice[top])]:
+            if dice[best] < min(threshold, ONE_EDIT_THRESHOLD):
+                break
+            candidate = self.aliases[best]
+            if dice[best] < threshold and not (
+                len(alias) >= 5 and _one_edit(alias, candidate)
+            ):
+                continue
+            if _same_variant(words, candidate.split()):
+                return int(self._alias_vehicle[best]), float(dice[best])
+        return None
+
+    def resolve(self, text, threshold=None, fuzzy=True):
+        """The Match for a name such as "maruti brezza", or None.
+
+        With fuzzy=False only exact names and aliases match.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        vehicle = self.exact(tokens)
+        if vehicle is not None:
+            return self._match(vehicle, 1.0, text)
+        names = [tokens]
+        # "maruti brezza": drop a leading brand the alias table lacks
+        for size in (2, 1):
+            if len(tokens) > size and " ".join(tokens[:size]) in self.brands:
+                vehicle = self.exact(tokens[size:])
+                if vehicle is not None:
+                    return self._match(vehicle, 1.0, text)
+                names.append(tokens[size:])
+        if not fuzzy or any(" ".join(n) in self._ambiguous for n in names):
+            return None
+        found = [self.fuzzy(" ".join(name), threshold) for name in names]
+        found = max(filter(None, found), key=lambda f: f[1], default=None)
+        return None if found is None else self._match(found[0], found[1], text)
+
+    def resolve_batch(self, texts, threshold=None):
+        """resolve() for many names; exact names skip the fuzzy index."""
+        return [self.resolve(text, threshold) for text in texts]
+
+    def _scan(self, tokens, threshold):
+        # (start, size, Match) for each name in the tokens, longest span first
+        found = []
+        i = 0
+        while i < len(tokens):
+            hit = None
+            for size in range(min(MAX_SPAN, len(tokens) - i), 0, -1):
+                span = tokens[i:i + size]
+                if all(t in _GENERIC for t in span) or " ".join(span) in self.brands:
+                    continue
+                vehicle = self.exact(span)
+                if vehicle is not None:
+                    hit = size, self._match(vehicle, 1.0, " ".join(span))
+                    break
+            token = tokens[i]
+            if hit is None and len(token) >= 4 and not (
+                token in _GENERIC or token.isdigit() or token in self._ambiguous
+            ):
+                # Misspelt single words ("brezaa") only; longer fuzzy
+                # spans pick up too many false friends in free text
+                fuzzy = self.fuzzy(token, threshold)
+                if fuzzy is not None:
+                    hit = 1, self._match(fuzzy[0], fuzzy[1], token)
+            if hit is None:
+                i += 1
+                continue
+            found.append((i, *hit))
+            i += hit[0]
+        return found
+
+    def find_mentions(self, text, threshold=None):
+        """Vehicles named anywhere in a query, in order of appearance."""
+        threshold = MENTION_THRESHOLD if threshold is None else threshold
+        mentions = []
+        for _, _, match in self._scan(tokenize(text), threshold):
+            if all(m.key != match.key for m in mentions):
+                mentions.append(match)
+        return mentions
+
+    def canonical_query(self, text, threshold=None):
+        """Tokenized query with each vehicle named replaced by its key.
+
+        "Brezza vs Nexon mileage" and "maruti vitara brezza vs tata nexon
+        mileage" give the same string, so they can share a cache entry.
+        """
+        threshold = MENTION_THRESHOLD if threshold is None else threshold
+        text = normalize_query(text)
+        tokens = tokenize(text)
+        # Whatever the tokenizer drops must not make two questions collide
+        if sum(map(len, tokens)) < MIN_TOKEN_COVERAGE * len(text.replace(" ", "")):
+            return text
+        for start, size, match in reversed(self._scan(tokens, threshold)):
+            tokens[start:start + size] = [match.key]
+        return " ".join(tokens)
+
+
+# ============================================
+# 3️⃣ Shared Index Over The Catalog
+# ============================================
+
+_index = NameIndex([])
+_source = None
+_lock = threading.Lock()
+
+
+def _rebuild(new_catalog, first=False):
+    # Runs on the catalog's refresher thread: lookups keep using the old
+    # index until the new one is swapped in
+    global _index, _source
+    index = NameIndex(
+        (row["key"], row["brand"], row["model"]) for row in new_catalog.rows
+    )
+    with _lock:
+        # A first build from an older snapshot must not replace a refresh
+        if not first or _source is None:
+            _index, _source = index, new_catalog.rows
+
+
+catalog.on_refresh(_rebuild)
+
+
+def get():
+    """The index over the current catalog, rebuilt along with it."""
+    current = catalog.get()
+    if _source is None:
+        # The catalog was first built before this module was imported
+        _rebuild(current, first=True)
+    return _index
+
+
+def resolve(text, threshold=None, fuzzy=True):
+    return get().resolve(text, threshold, fuzzy)
+
+
+def resolve_batch(texts, threshold=None):
+    """resolve() for many names against one snapshot of the index."""
+    return get().resolve_batch(texts, threshold)
+
+
+def find_mentions(text, threshold=None):
+    return get().find_mentions(text, threshold)
+
+
+def canonical_query(text):
+    return get().canonical_query(text)
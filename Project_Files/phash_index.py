@@ -0,0 +1,131 @@
+# ============================================
+# AutoSage - Perceptual Hash Near-Duplicate Index
+# ============================================
+# A resized, re-compressed or screenshotted copy of a photo has different
+# bytes but almost the same 64-bit difference hash (dHash). This index
+# finds stored hashes within a Hamming distance of a query using
+# multi-index hashing: the hash is split into 3 blocks of 21-22 bits, and by
+# the pigeonhole principle any match within distance r agrees with the
+# query to within r // 3 bits on at least one block. Only those block
+# variants are probed. The probes grow quickly with the radius: with 200k
+# stored hashes a lookup takes ~0.2 ms at the default radius 8 but ~6 ms at
+# the degraded radius 12 (benchmarks/bench_phash.py), so the sub-millisecond
+# figure holds up to radius 8.
+
+import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import combinations
+
+from PIL import Image, ImageOps
+
+HASH_BITS = 64
+# (shift, width) of each block; wide blocks keep buckets nearly empty
+BLOCK_LAYOUT = ((0, 22), (22, 21), (43, 21))
+BLOCKS = len(BLOCK_LAYOUT)
+
+
+def dhash(image, hash_size=8):
+    """64-bit difference hash of a PIL image (or raw encoded image bytes)."""
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(image))
+        # Let the JPEG decoder skip most of the full-resolution work
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        image = ImageOps.exif_transpose(image)
+    small = image.convert("L").resize(
+        (hash_size + 1, hash_size), Image.Resampling.LANCZOS
+    )
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def _blocks(value):
+    return [(value >> shift) & ((1 << width) - 1) for shift, width in BLOCK_LAYOUT]
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(width, radius):
+    # XOR masks that flip up to `radius` bits of a `width`-bit block
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in combinations(range(width), r):
+            masks.append(sum(1 << bit for bit in bits))
+    return tuple(masks)
+
+
+class PHashIndex:
+    """Maps 64-bit perceptual hashes to values with Hamming-radius lookup.
+
+    Holds at most `maxsize` hashes; the oldest inserted is evicted first.
+    """
+
+    def __init__(self, maxsize=200_000):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._tables = [{} for _ in range(BLOCKS)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def add(self, phash, value):
+        with self._lock:
+            if phash in self._values:
+                self._values[phash] = value
+                self._values.move_to_end(phash)
+                return
+            self._values[phash] = value
+            for table, block in zip(self._tables, _blocks(phash)):
+                table.setdefault(block, set()).add(phash)
+            while len(self._values) > self.maxsize:
+                self._remove(next(iter(self._values)))
+
+    def _remove(self, phash):
+        del self._values[phash]
+        for table, block in zip(self._tables, _blocks(phash)):
+            bucket = table.get(block)
+            if bucket is not None:
+                bucket.discard(phash)
+                if not bucket:
+                    del table[block]
+
+    def search(self, phash, max_distance):
+        """All (distance, hash, value) within max_distance, nearest first."""
+        if max_distance < 0:
+            return []
+        radius = max_distance // BLOCKS
+        candidates = set()
+        with self._lock:
+            for table, block, (_, width) in zip(
+                self._tables, _blocks(phash), BLOCK_LAYOUT
+            ):
+                get = table.get
+                for mask in _flip_masks(width, radius):
+                    bucket = get(block ^ mask)
+                    if bucket:
+                        candidates.update(bucket)
+            matches = []
+            for candidate in candidates:
+                distance = (phash ^ candidate).bit_count()
+                if distance <= max_distance:
+                    matches.append((distance, candidate, self._values[candidate]))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def nearest(self, phash, max_distance):
+        """(distance, value) of the closest stored hash, or None."""
+        matches = self.search(phash, max_distance)
+        if not matches:
+            return None
+        distance, _, value = matches[0]
+        return distance, value
@@ -0,0 +1,188 @@
+# ============================================
+# AutoSage - Shared Model Rate Limiter
+# ============================================
+# Every Streamlit session used to call generate_content directly, so a
+# burst of users turned into a burst of 429s. All model calls in the
+# process now pass through one limiter that enforces:
+#   - a cap on concurrent calls,
+#   - a requests-per-minute and a tokens-per-minute token bucket,
+#   - round-robin fairness between sessions, so one user clicking
+#     repeatedly cannot starve everyone else.
+
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Which session a call belongs to; the Streamlit app sets it on every run.
+current_session = contextvars.ContextVar("autosage_session", default="background")
+# Carries the session from UI servers to the headless service (service.py)
+SESSION_HEADER = "X-AutoSage-Session"
+
+# Gemini bills an image as 258 tokens per 768px tile; preprocessed uploads
+# are at most 1536px, i.e. up to 4 tiles.
+IMAGE_TOKENS = 4 * 258
+# Assumed response size until the real usage is known
+OUTPUT_TOKENS = 800
+# How often coroutines waiting for a slot re-check the queue
+ASYNC_POLL_SECONDS = 0.05
+
+
+def estimate_tokens(contents):
+    """Rough prompt + response token count used to reserve TPM budget."""
+    if not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    total = OUTPUT_TOKENS
+    for part in contents:
+        if isinstance(part, str):
+            total += math.ceil(len(part) / 4)
+        else:
+            total += IMAGE_TOKENS
+    return total
+
+
+class TokenBucket:
+    """Refills `per_minute` tokens per minute up to `per_minute` capacity."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        refill = (now - self._updated) * self.per_minute / 60
+        self._tokens = min(self.capacity, self._tokens + refill)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        if not self.per_minute:
+            return 0.0
+        self._refill(now)
+        # Never ask for more than a full bucket or the wait would be endless
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) * 60 / self.per_minute
+
+    def consume(self, amount):
+        # May go negative: an underestimate is paid back before the next call
+        if self.per_minute:
+            self._tokens -= amount
+
+
+class ModelLimiter:
+    """Process-wide gate in front of every model call."""
+
+    def __init__(
+        self, max_concurrency=8, requests_per_minute=60, tokens_per_minute=0
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # session -> deque of waiting tickets
+        self._active = 0
+        self._waits = deque(maxlen=200)
+
+    def _is_next(self, ticket):
+        # The head of the first session in line goes next; sessions rotate
+        # to the back after each grant, which gives round-robin fairness.
+        first = next(iter(self._queues.values()), None)
+        return first is not None and first[0] is ticket
+
+    def _ready_in(self, ticket, estimated_tokens):
+        """0 if the ticket may start now, seconds to wait if throttled by a
+        bucket, or None if it is waiting on another call to finish."""
+        if not (self._is_next(ticket) and self._active < self.max_concurrency):
+            return None
+        now = time.monotonic()
+        return max(
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(estimated_tokens, now),
+        )
+
+    def _leave_queue(self, session, ticket):
+        queue = self._queues.pop(session)
+        queue.remove(ticket)
+        if queue:
+            self._queues[session] = queue
+
+    def _start_call(self, session, estimated_tokens, enqueued):
+        self.requests.consume(1)
+        self.tokens.consume(estimated_tokens)
+        self._active += 1
+        waited = time.monotonic() - enqueued
+        self._waits.append(waited)
+        if waited > 1:
+            logger.info("Model call for %s waited %.1fs in queue", session, waited)
+
+    def _usage_recorder(self, estimated_tokens):
+        def record_usage(actual_tokens):
+            # Settle the difference between the estimate and the real usage
+            if actual_tokens:
+                with self._lock:
+                    self.tokens.consume(actual_tokens - estimated_tokens)
+
+        return record_usage
+
+    def _end_call(self):
+        with self._lock:
+            self._active -= 1
+
+    @asynccontextmanager
+    async def aslot(self, estimated_tokens=0, session=None):
+        """Wait until a call may start; yields a function to report usage.
+
+        Waiters re-check the queue every ASYNC_POLL_SECONDS, or sleep until
+        a throttling bucket refills.
+        """
+        session = session or current_session.get()
+        ticket = object()
+        enqueued = time.monotonic()
+        with self._lock:
+            self._queues.setdefault(session, deque()).append(ticket)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._ready_in(ticket, estimated_tokens)
+                    if delay is not None and delay <= 0:
+                        self._leave_queue(session, ticket)
+                        self._start_call(session, estimated_tokens, enqueued)
+                        break
+                await asyncio.sleep(delay or ASYNC_POLL_SECONDS)
+        except BaseException:
+            # Cancelled while waiting: give up our place in line
+            with self._lock:
+                self._leave_queue(session, ticket)
+            raise
+        try:
+            yield self._usage_recorder(estimated_tokens)
+        finally:
+            self._end_call()
+
+    def stats(self):
+        with self._lock:
+            waits = list(self._waits)
+            return {
+                "active": self._active,
+                "queue_depth": sum(len(q) for q in self._queues.values()),
+                "waiting_sessions": len(self._queues),
+                "avg_wait_s": sum(waits) / len(waits) if waits else 0.0,
+                "max_wait_s": max(waits, default=0.0),
+            }
+
+
+limiter = ModelLimiter(
+    max_concurrency=int(os.getenv("AUTOSAGE_MAX_CONCURRENCY", "8")),
+    requests_per_minute=int(os.getenv("AUTOSAGE_RPM", "60")),
+    tokens_per_minute=int(os.getenv("AUTOSAGE_TPM", "1000000")),
+)
@@ -0,0 +1,225 @@
+# ============================================
+# AutoSage - Response Caches
+# ============================================
+# In-process caches shared by every Streamlit session. Entries expire after
+# a TTL and the least recently used entry is evicted once the cache is full.
+# Sizes and TTLs are read from the environment so they can be tuned per
+# deployment without code changes.
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import phash_index
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after insert."""
+
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        h.update(hashlib.sha256(part).digest())
+    return h.hexdigest()
+
+
+# ============================================
+# Image Analysis Cache
+# ============================================
+
+def image_key(image_bytes, prompt, model_name):
+    # Hashing the prompt text makes it the prompt version: editing
+    # image_prompt invalidates old analyses automatically.
+    return _digest(image_bytes, prompt, model_name)
+
+
+image_results = TTLCache(
+    maxsize=_env_int("AUTOSAGE_IMAGE_CACHE_SIZE", 512),
+    ttl=_env_int("AUTOSAGE_IMAGE_CACHE_TTL", 24 * 3600),
+)
+
+
+# Near-duplicate lookup: a perceptual hash of every analysed image points at
+# its exact-cache key, so a resized or re-compressed re-upload can reuse
+# the stored analysis. A negative distance disables the lookup.
+PHASH_MAX_DISTANCE = _env_int("AUTOSAGE_PHASH_MAX_DISTANCE", 8)
+# Looser match accepted only while the model is unavailable
+DEGRADED_PHASH_MAX_DISTANCE = _env_int("AUTOSAGE_DEGRADED_PHASH_MAX_DISTANCE", 12)
+
+_near_indexes = {}
+_near_lock = threading.Lock()
+
+
+def _near_index(prompt, model_name):
+    # One index per prompt/model so a prompt change never serves stale output
+    namespace = _digest(prompt, model_name)
+    with _near_lock:
+        index = _near_indexes.get(namespace)
+        if index is None:
+            index = phash_index.PHashIndex(
+                maxsize=_env_int("AUTOSAGE_PHASH_INDEX_SIZE", 200_000)
+            )
+            _near_indexes[namespace] = index
+        return index
+
+
+def _fingerprint(image_bytes):
+    try:
+        return phash_index.dhash(image_bytes)
+    except Exception:
+        # Not decodable by Pillow; fall back to exact matching only
+        return None
+
+
+def get_image_result(image_bytes, prompt, model_name, max_distance=None):
+    """Look up a stored analysis; returns (key, fingerprint, text or None)."""
+    if max_distance is None:
+        max_distance = PHASH_MAX_DISTANCE
+    key = image_key(image_bytes, prompt, model_name)
+    text = image_results.get(key)
+    if text is not None or max_distance < 0:
+        return key, None, text
+
+    fingerprint = _fingerprint(image_bytes)
+    if fingerprint is not None:
+        match = _near_index(prompt, model_name).nearest(fingerprint, max_distance)
+        if match is not None:
+            text = image_results.get(match[1])
+            if text is not None:
+                image_results.set(key, text)
+    return key, fingerprint, text
+
+
+def put_image_result(key, fingerprint, text, prompt, model_name):
+    image_results.set(key, text)
+    if fingerprint is not None:
+        _near_index(prompt, model_name).add(fingerprint, key)
+
+
+# ============================================
+# Chat Response Cache
+# ============================================
+# Popular questions arrive in many spellings ("Best bikes under 2 Lakhs",
+# "best bikes under rs 2 lakh?", "best bikes under ₹2L"). Queries are
+# normalized before hashing so these all share one cache entry.
+
+_MULTIPLIERS = {
+    "thousand": 1_000,
+    "k": 1_000,
+    "lakh": 100_000,
+    "lakhs": 100_000,
+    "lac": 100_000,
+    "lacs": 100_000,
+    "l": 100_000,
+    "crore": 10_000_000,
+    "crores": 10_000_000,
+    "cr": 10_000_000,
+}
+
+_CURRENCY = r"(?:₹|(?<![a-z])(?:rs\.?|inr|rupees?)(?![a-z]))"
+_AMOUNT_RE = re.compile(
+    rf"(?P<pre>{_CURRENCY}\s*)?"
+    r"(?P<number>\d[\d,]*(?:\.\d+)?)\s*"
+    r"(?P<unit>thousand|k|lakhs?|lacs?|l|crores?|cr)?\b"
+    rf"(?P<post>\s*{_CURRENCY})?"
+)
+# "2-3 lakh" -> "2 lakh to 3 lakh", so both ends get the multiplier
+_RANGE_RE = re.compile(
+    r"(\d[\d,]*(?:\.\d+)?)\s*(?:-|–|to)\s*"
+    r"(?=\d[\d,]*(?:\.\d+)?\s*(thousand|k|lakhs?|lacs?|l|crores?|cr)\b)"
+)
+_UNIT_PHRASES = [
+    (re.compile(r"\bkms\b|\bkilomet(?:er|re)s?\b"), "km"),
+    (re.compile(r"\bkm\s*(?:/|per)\s*(?:l|ltr|litre|liter)\b|\bkmpl\b"), "kmpl"),
+    (re.compile(r"\bkm\s*(?:/|per)\s*charge\b"), "km/charge"),
+    (re.compile(r"\bcubic capacity\b"), "cc"),
+]
+
+
+def _canonical_amount(match):
+    unit = match.group("unit")
+    if unit is None and not (match.group("pre") or match.group("post")):
+        # A bare number ("3 cars", "2024"): leave it as written
+        return match.group(0)
+    value = float(match.group("number").replace(",", ""))
+    value *= _MULTIPLIERS.get(unit, 1)
+    return f"₹{value:.0f} "
+
+
+def normalize_query(query):
+    """Case-fold, collapse whitespace and canonicalize currency/units."""
+    text = query.casefold()
+    text = re.sub(r"[?!.]+$", "", text.strip())
+    for pattern, replacement in _UNIT_PHRASES:
+        text = pattern.sub(replacement, text)
+    text = _RANGE_RE.sub(r"\1 \2 to ", text)
+    text = _AMOUNT_RE.sub(_canonical_amount, text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def chat_key(query, prompt_template, model_name):
+    return _digest(normalize_query(query), prompt_template, model_name)
+
+
+chat_results = TTLCache(
+    maxsize=_env_int("AUTOSAGE_CHAT_CACHE_SIZE", 1024),
+    ttl=_env_int("AUTOSAGE_CHAT_CACHE_TTL", 6 * 3600),
+)
@@ -0,0 +1,127 @@
+# ============================================
+# AutoSage - Retry Policy For Model Calls
+# ============================================
+# Transient Gemini errors (429 / 500 / 503 / timeouts) are retried with
+# capped exponential backoff and full jitter, waiting at least as long as
+# any retry-after hint in the error. Every request also has an end-to-end
+# deadline: each attempt's timeout is whatever budget is left, and a
+# backoff that would overrun the budget gives up instead. The SDK's own
+# retry (up to 600s on 503) is disabled so this is the only retry layer.
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions as core_exceptions
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    core_exceptions.TooManyRequests,
+    core_exceptions.ResourceExhausted,
+    core_exceptions.InternalServerError,
+    core_exceptions.ServiceUnavailable,
+    core_exceptions.DeadlineExceeded,
+    core_exceptions.GatewayTimeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+# Anything a model call can fail with once retries are used up
+MODEL_ERRORS = (core_exceptions.GoogleAPIError, ConnectionError, TimeoutError)
+
+_RETRY_IN_RE = re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "requests": 0,
+    "retries": 0,
+    "backoff_seconds": 0.0,
+    "gave_up": 0,
+    "deadline_exhausted": 0,
+}
+
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def metrics():
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def retry_after(exc):
+    """Seconds the server asked us to wait, if the error says so."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    if headers.get("Retry-After"):
+        try:
+            return float(headers["Retry-After"])
+        except ValueError:
+            pass
+    # google.rpc.RetryInfo attached to gRPC/REST errors
+    for detail in getattr(exc, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    match = _RETRY_IN_RE.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+class RetryPolicy:
+    """Backoff schedule plus an end-to-end deadline for one logical request."""
+
+    def __init__(
+        self, max_attempts=4, base_delay=1.0, max_delay=20.0, deadline=60.0
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def start(self):
+        _count("requests")
+        return time.monotonic()
+
+    def remaining(self, started_at):
+        return self.deadline - (time.monotonic() - started_at)
+
+    def next_delay(self, exc, attempt, started_at):
+        """Seconds to wait before the next attempt; re-raises `exc` to stop.
+
+        `attempt` is the 0-based number of the attempt that just failed.
+        """
+        if not isinstance(exc, RETRYABLE_ERRORS) or attempt + 1 >= self.max_attempts:
+            _count("gave_up")
+            raise exc
+        ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+        delay = random.uniform(0, ceiling)
+        hint = retry_after(exc)
+        if hint is not None:
+            delay = max(delay, hint)
+        if delay >= self.remaining(started_at):
+            _count("gave_up")
+            _count("deadline_exhausted")
+            raise exc
+        logger.warning(
+            "Model call failed (%s); retry %d in %.1fs",
+            type(exc).__name__,
+            attempt + 1,
+            delay,
+        )
+        _count("retries")
+        _count("backoff_seconds", delay)
+        return delay
+
+
+default_policy = RetryPolicy(
+    max_attempts=int(os.getenv("AUTOSAGE_RETRY_ATTEMPTS", "4")),
+    base_delay=float(os.getenv("AUTOSAGE_RETRY_BASE_DELAY", "1")),
+    max_delay=float(os.getenv("AUTOSAGE_RETRY_MAX_DELAY", "20")),
+    deadline=float(os.getenv("AUTOSAGE_DEADLINE", "60")),
+)
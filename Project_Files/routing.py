@@ -0,0 +1,219 @@
+# ============================================
+# AutoSage - Tiered Model Routing
+# ============================================
+# Instead of sending everything to one hard-coded model, each task walks a
+# ladder of Gemini tiers from cheapest/fastest to most capable. A route
+# policy says which rung a task starts on, how high it may climb, and how
+# to validate an answer; an answer that fails validation (e.g. an image
+# analysis missing required sections) is retried one rung up. Every
+# decision is recorded with its latency and estimated token cost so the
+# ladder can be tuned from real traffic.
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+import async_client
+import model_client
+import rate_limit
+import vehicle_report
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LADDER = [
+    "models/gemini-2.5-flash-lite",
+    "models/gemini-2.5-flash",
+    "models/gemini-2.5-pro",
+]
+
+# Yielded by Router.astream() when an answer is abandoned for a higher tier;
+# consumers should discard everything streamed so far.
+RESTART = object()
+
+# Sections image_prompt asks for; all of them must be present
+IMAGE_SECTIONS = [
+    "Brand",
+    "Model",
+    "Launch Year",
+    "Vehicle Type",
+    "Fuel Type",
+    "Key Features",
+    "Mileage",
+    "Average Price in INR",
+    "Safety Features",
+]
+
+
+def _has_section(text, name):
+    # Tolerates markdown decoration such as "**Brand:**" or "### Brand:"
+    pattern = rf"^[\s*#>_-]*{re.escape(name)}[\s*_]*:"
+    return re.search(pattern, text, re.IGNORECASE | re.MULTILINE) is not None
+
+
+def validate_image_analysis(text):
+    return all(_has_section(text, name) for name in IMAGE_SECTIONS)
+
+
+def validate_identification(text):
+    return _has_section(text, "Brand") and _has_section(text, "Model")
+
+
+def validate_image_report(text):
+    try:
+        return vehicle_report.VehicleReport.from_json(text).is_complete()
+    except ValueError:
+        return False
+
+
+def validate_comparison(text):
+    return len(text.strip()) >= 200 and "recommend" in text.lower()
+
+
+def validate_lookup(text):
+    return len(text.strip()) >= 80
+
+
+class RoutePolicy:
+    def __init__(self, start_tier, max_tier, validator, generation_config=None):
+        self.start_tier = start_tier
+        self.max_tier = max_tier
+        self.validator = validator
+        self.generation_config = generation_config
+
+
+def _tiers_from_env(name, default):
+    # AUTOSAGE_ROUTE_<NAME>="start-max", e.g. "0-2"
+    value = os.getenv(f"AUTOSAGE_ROUTE_{name.upper()}", default)
+    start, _, end = value.partition("-")
+    return int(start), int(end or start)
+
+
+def _policy(name, default_tiers, validator, generation_config=None):
+    return RoutePolicy(
+        *_tiers_from_env(name, default_tiers), validator, generation_config
+    )
+
+
+ROUTES = {
+    "image": _policy("image", "0-2", validate_image_analysis),
+    "image_identify": _policy("image_identify", "0-1", validate_identification),
+    "image_report": _policy(
+        "image_report", "0-2", validate_image_report, vehicle_report.GENERATION_CONFIG
+    ),
+    "chat_lookup": _policy("chat_lookup", "0-1", validate_lookup),
+    "chat_compare": _policy("chat_compare", "0-2", validate_comparison),
+}
+
+_COMPARE_RE = re.compile(
+    r"\b(compare|comparison|vs\.?|versus|better than|difference between)\b",
+    re.IGNORECASE,
+)
+
+
+def chat_route(user_query):
+    return "chat_compare" if _COMPARE_RE.search(user_query) else "chat_lookup"
+
+
+def _new_stats():
+    return {
+        "calls": 0,
+        "accepted": 0,
+        "escalated": 0,
+        "latency_s": 0.0,
+        "est_tokens": 0,
+    }
+
+
+class Router:
+    def __init__(self, ladder, routes):
+        self.ladder = ladder
+        self.routes = routes
+        self._stats = defaultdict(_new_stats)
+        self._lock = threading.Lock()
+
+    def cache_id(self):
+        # Cached answers are tied to the ladder that produced them
+        return ">".join(self.ladder)
+
+    def _tiers(self, route):
+        policy = self.routes[route]
+        last = min(policy.max_tier, len(self.ladder) - 1)
+        start = min(policy.start_tier, last)
+        return policy, [self.ladder[i] for i in range(start, last + 1)]
+
+    def _record(self, route, model_name, contents, text, latency, valid, escalated):
+        tokens = rate_limit.estimate_tokens(contents) - rate_limit.OUTPUT_TOKENS
+        tokens += len(text) // 4
+        with self._lock:
+            entry = self._stats[(route, model_name)]
+            entry["calls"] += 1
+            entry["accepted"] += valid
+            entry["escalated"] += escalated
+            entry["latency_s"] += latency
+            entry["est_tokens"] += tokens
+        logger.info(
+            "route=%s model=%s latency=%.2fs tokens~%d valid=%s escalated=%s",
+            route,
+            model_name,
+            latency,
+            tokens,
+            valid,
+            escalated,
+        )
+
+    async def agenerate(self, route, contents):
+        """Full answer from the lowest tier that passes validation.
+
+        If no tier passes, the top tier's answer is returned as-is. Must
+        run on the async_client runtime loop.
+        """
+        policy, models = self._tiers(route)
+        for i, model_name in enumerate(models):
+            started = time.monotonic()
+            text = await async_client.generate_text(
+                model_client.get_model(model_name, policy.generation_config),
+                contents,
+            )
+            valid = policy.validator(text)
+            escalate = not valid and i < len(models) - 1
+            latency = time.monotonic() - started
+            self._record(route, model_name, contents, text, latency, valid, escalate)
+            if not escalate:
+                return text
+
+    async def astream(self, route, contents):
+        """Stream from the lowest tier; yields RESTART before escalating.
+
+        Must run on the async_client runtime loop.
+        """
+        policy, models = self._tiers(route)
+        for i, model_name in enumerate(models):
+            started = time.monotonic()
+            chunks = []
+            async for chunk in async_client.stream_text(
+                model_client.get_model(model_name, policy.generation_config),
+                contents,
+            ):
+                chunks.append(chunk)
+                yield chunk
+            text = "".join(chunks)
+            valid = policy.validator(text)
+            escalate = not valid and i < len(models) - 1
+            latency = time.monotonic() - started
+            self._record(route, model_name, contents, text, latency, valid, escalate)
+            if not escalate:
+                return
+            yield RESTART
+
+    def stats(self):
+        """Per (route, model): calls, accepted, escalated, latency, tokens."""
+        with self._lock:
+            return {key: dict(value) for key, value in self._stats.items()}
+
+
+_ladder = os.getenv("AUTOSAGE_MODEL_LADDER", ",".join(DEFAULT_LADDER))
+_ladder = [name.strip() for name in _ladder.split(",") if name.strip()]
+router = Router(_ladder, ROUTES)
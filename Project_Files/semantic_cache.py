@@ -0,0 +1,262 @@
+# ============================================
+# AutoSage - Semantic Chat Cache
+# ============================================
+# Catches paraphrased chat queries ("best bike below 2 lakh" vs "top
+# motorcycles under ₹2L") that the exact normalized-query cache misses.
+# Queries are embedded locally with a hashed word + character-trigram
+# vectorizer (no model download, stable across processes) and stored in a
+# preallocated NumPy matrix; a lookup is one matrix-vector product.
+#
+# Cosine similarity alone would happily match "under 2 lakh" with "under
+# 3 lakh" or "above 2 lakh", or "best bikes" with "best electric bikes",
+# so every entry also carries a guard: the numbers in the query, which way
+# a budget points, and its fuel, body type, transmission and condition
+# words. A hit needs the same guard and a similarity above the threshold.
+
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from response_cache import normalize_query
+
+DIM = 256
+
+# Paraphrases score ~1.0, but one extra qualifier barely moves the score
+# ("best cars under 10 lakh" vs "best diesel cars under 10 lakh" is 0.91),
+# so the guard, not the threshold, keeps those apart. Set above 1 to
+# disable.
+THRESHOLD = float(os.getenv("AUTOSAGE_SEMANTIC_THRESHOLD", "0.9"))
+# Looser threshold accepted only while the model is unavailable
+DEGRADED_THRESHOLD = float(os.getenv("AUTOSAGE_DEGRADED_SEMANTIC_THRESHOLD", "0.8"))
+CAPACITY = int(os.getenv("AUTOSAGE_SEMANTIC_CACHE_SIZE", "10000"))
+TTL = int(os.getenv("AUTOSAGE_CHAT_CACHE_TTL", str(6 * 3600)))
+
+_SYNONYMS = {
+    "top": "best",
+    "good": "best",
+    "greatest": "best",
+    "below": "under",
+    "within": "under",
+    "upto": "under",
+    "motorcycle": "bike",
+    "motorcycles": "bike",
+    "motorbike": "bike",
+    "motorbikes": "bike",
+    "bikes": "bike",
+    "cars": "car",
+    "scooters": "scooter",
+    "scooty": "scooter",
+    "vs": "compare",
+    "versus": "compare",
+    "electric": "ev",
+    "evs": "ev",
+    "tips": "tip",
+    "sport": "sports",
+    "suvs": "suv",
+    "sedans": "sedan",
+    "hatchbacks": "hatchback",
+    "hybrids": "hybrid",
+}
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "which", "what", "me", "please", "suggest",
+    "some", "for", "of", "i", "want", "to", "buy", "can", "you", "tell", "in",
+    "india", "option", "options", "with", "my", "and",
+}
+# Budget direction words, after _SYNONYMS; part of the guard
+_DIRECTIONS = {
+    "under": "under",
+    "less": "under",
+    "max": "under",
+    "maximum": "under",
+    "cheaper": "under",
+    "above": "over",
+    "over": "over",
+    "more": "over",
+    "min": "over",
+    "minimum": "over",
+    "least": "over",
+    "around": "around",
+    "about": "around",
+    "approx": "around",
+    "near": "around",
+    "between": "between",
+}
+# Words that change which vehicles are meant, after _SYNONYMS; part of the
+# guard
+_QUALIFIERS = {
+    "ev", "petrol", "diesel", "cng", "hybrid",
+    "automatic", "manual", "amt",
+    "used", "new",
+    "bike", "car", "scooter", "suv", "sedan", "hatchback", "muv",
+    "sports", "cruiser", "adventure", "commuter",
+}
+_TOKEN_RE = re.compile(r"[\w₹/]+")
+
+
+def _tokens(query):
+    words = _TOKEN_RE.findall(normalize_query(query))
+    return [_SYNONYMS.get(w, w) for w in words if w not in _STOPWORDS]
+
+
+def guard(query):
+    """Numbers, budget direction and vehicle qualifiers in the query.
+
+    Entries only match queries with the same guard, so "under 2 lakh"
+    never answers "above 2 lakh" and "bikes" never answers "electric
+    bikes".
+    """
+    tokens = _tokens(query)
+    numbers = sorted(t for t in tokens if any(c.isdigit() for c in t))
+    directions = []
+    if numbers:
+        directions = sorted({_DIRECTIONS[t] for t in tokens if t in _DIRECTIONS})
+    qualifiers = sorted({t for t in tokens if t in _QUALIFIERS})
+    return (*numbers, *directions, *qualifiers)
+
+
+def _features(tokens):
+    for token in tokens:
+        # Whole words count double so word choice outweighs spelling
+        yield token, 2.0
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            yield padded[i:i + 3], 1.0
+
+
+def embed(query, dim=DIM):
+    """L2-normalized float32 embedding of a query."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(_tokens(query)):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_batch(queries, dim=DIM):
+    vectors = np.zeros((len(queries), dim), dtype=np.float32)
+    for i, query in enumerate(queries):
+        vectors[i] = embed(query, dim)
+    return vectors
+
+
+class VectorIndex:
+    """Fixed-capacity cosine-similarity index with TTL and LRU eviction.
+
+    Vectors live in one preallocated (capacity x dim) float32 matrix; when
+    it is full the least recently used entries are overwritten.
+    """
+
+    def __init__(self, capacity=10_000, dim=DIM, ttl=6 * 3600):
+        self.capacity = capacity
+        self.dim = dim
+        self.ttl = ttl
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._last_used = np.full(capacity, -np.inf)
+        self._expires = np.full(capacity, -np.inf)
+        self._values = [None] * capacity
+        self._guards = [None] * capacity
+        self._high = 0  # slots [0, _high) have been written at least once
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(np.count_nonzero(self._expires[: self._high] > time.monotonic()))
+
+    def _allocate(self, count, now):
+        # Fresh slots first, then expired ones, then the least recently used
+        fresh = min(count, self.capacity - self._high)
+        slots = list(range(self._high, self._high + fresh))
+        self._high += fresh
+        if len(slots) < count:
+            need = count - len(slots)
+            # Expired entries sort first because their recency is forced to -inf
+            live = self._expires[: self._high] > now
+            recency = np.where(live, self._last_used[: self._high], -np.inf)
+            recency[slots] = np.inf
+            oldest = np.argpartition(recency, need - 1)[:need]
+            slots.extend(int(i) for i in oldest)
+        return slots
+
+    def add_batch(self, vectors, values, guards):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > self.capacity:
+            vectors = vectors[-self.capacity:]
+            values = values[-self.capacity:]
+            guards = guards[-self.capacity:]
+        with self._lock:
+            now = time.monotonic()
+            slots = self._allocate(len(vectors), now)
+            self._vectors[slots] = vectors
+            self._last_used[slots] = now
+            self._expires[slots] = now + self.ttl
+            for slot, value, entry_guard in zip(slots, values, guards):
+                self._values[slot] = value
+                self._guards[slot] = entry_guard
+
+    def add(self, vector, value, entry_guard=()):
+        self.add_batch([vector], [value], [entry_guard])
+
+    def add_queries(self, queries, values):
+        """Embed and insert many queries in one locked batch."""
+        self.add_batch(embed_batch(queries), values, [guard(q) for q in queries])
+
+    def search(self, vector, threshold, entry_guard=(), candidates=8):
+        """(similarity, value) of the best live match above threshold, or None."""
+        with self._lock:
+            n = self._high
+            if n == 0:
+                return None
+            now = time.monotonic()
+            sims = self._vectors[:n] @ vector
+            k = min(candidates, n)
+            top = np.argpartition(sims, n - k)[n - k:]
+            for slot in top[np.argsort(sims[top])[::-1]]:
+                similarity = float(sims[slot])
+                if similarity < threshold:
+                    break
+                # Expired entries are skipped here rather than masked up front,
+                # which would cost a full pass over the matrix per lookup
+                if self._expires[slot] > now and self._guards[slot] == entry_guard:
+                    self._last_used[slot] = now
+                    return similarity, self._values[slot]
+        return None
+
+
+# ============================================
+# Chat Integration
+# ============================================
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index(prompt_template, model_name):
+    # One index per prompt template/model so template edits start fresh
+    namespace = (prompt_template, model_name)
+    with _indexes_lock:
+        index = _indexes.get(namespace)
+        if index is None:
+            index = VectorIndex(capacity=CAPACITY, ttl=TTL)
+            _indexes[namespace] = index
+        return index
+
+
+def lookup(query, prompt_template, model_name, threshold=None):
+    """Cached answer to a paraphrase of `query`, or None."""
+    threshold = THRESHOLD if threshold is None else threshold
+    if threshold > 1:
+        return None
+    match = _index(prompt_template, model_name).search(
+        embed(query), threshold, guard(query)
+    )
+    return match[1] if match else None
+
+
+def store(query, answer, prompt_template, model_name):
+    if THRESHOLD > 1:
+        return
+    _index(prompt_template, model_name).add(embed(query), answer, guard(query))
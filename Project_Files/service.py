@@ -0,0 +1,251 @@
+# ============================================
+# AutoSage - Headless Inference Service
+# ============================================
+# An ASGI app exposing the same analysis pipeline as the Streamlit UI, so
+# the inference tier can sit behind a load balancer and scale on its own:
+#
+#   uvicorn service:app --host 0.0.0.0 --port 8000 --workers 4
+#
+# Endpoints:
+#   POST /analyze   multipart form with an "image" file
+#   POST /chat      JSON body {"query": "..."}
+#   GET  /health    circuit breaker, rate limiter and cache stats
+#
+# Both POST endpoints stream by default as NDJSON events, one per line:
+#   {"chunk": "..."}      next piece of the answer
+#   {"restart": true}     discard what was streamed; a stronger model retries
+#   {"error": "...", ...} the stream failed part-way
+# With ?stream=0 they return {"analysis": "..."} / {"response": "..."}
+# instead, and /analyze?structured=1 returns {"report": {...}}.
+# ?degraded=1 only looks up a close earlier answer (404 if none), which is
+# what clients fall back to while the circuit is open. Uploads that are
+# already prepared (see api_client) pass through prepare_image unchanged.
+#
+# Callers may send X-AutoSage-Session so the shared rate limiter queues
+# them fairly against each other.
+
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import analysis
+import async_client
+import circuit_breaker
+import image_preprocess
+import model_client
+import rate_limit
+import response_cache
+import retry
+import routing
+import warmup
+
+logger = logging.getLogger(__name__)
+
+# Largest upload accepted by /analyze
+MAX_UPLOAD_BYTES = int(os.getenv("AUTOSAGE_MAX_UPLOAD_MB", "20")) * 1024 * 1024
+
+load_dotenv(Path(__file__).parent / ".env")
+model_client.configure(os.getenv("GOOGLE_API_KEY"))
+
+
+# ============================================
+# 1️⃣ Error Mapping
+# ============================================
+
+def _error_body(exc):
+    if isinstance(exc, circuit_breaker.CircuitOpenError):
+        return {"error": "circuit_open", "retry_in": exc.retry_in}
+    return {"error": "model_unavailable", "detail": type(exc).__name__}
+
+
+def _error_response(exc):
+    if isinstance(exc, circuit_breaker.CircuitOpenError):
+        return JSONResponse(
+            _error_body(exc),
+            status_code=503,
+            headers={"Retry-After": str(max(1, round(exc.retry_in)))},
+        )
+    return JSONResponse(_error_body(exc), status_code=502)
+
+
+def _event(payload):
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def _stream_response(chunks):
+    # Pull the first chunk before committing to a 200, so a request that
+    # fails up front (e.g. circuit open) still gets a proper status code
+    chunks = async_client.aiterate(chunks)
+    try:
+        first = await anext(chunks)
+    except StopAsyncIteration:
+        first = None
+    except (circuit_breaker.CircuitOpenError, *retry.MODEL_ERRORS) as exc:
+        return _error_response(exc)
+
+    async def events():
+        try:
+            if first is not None:
+                yield _encode(first)
+            async for chunk in chunks:
+                yield _encode(chunk)
+        except (circuit_breaker.CircuitOpenError, *retry.MODEL_ERRORS) as exc:
+            yield _event(_error_body(exc))
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _encode(chunk):
+    if chunk is routing.RESTART:
+        return _event({"restart": True})
+    return _event({"chunk": chunk})
+
+
+def _flag(request, name, default):
+    return request.query_params.get(name, default) not in ("0", "false", "")
+
+
+def _use_session(request):
+    session = request.headers.get(rate_limit.SESSION_HEADER)
+    if session:
+        rate_limit.current_session.set(session)
+
+
+# ============================================
+# 2️⃣ Image Analysis Endpoint
+# ============================================
+
+async def analyze(request):
+    _use_session(request)
+    form = await request.form(max_part_size=MAX_UPLOAD_BYTES)
+    upload = form.get("image")
+    if upload is None or not hasattr(upload, "read"):
+        return JSONResponse({"error": "missing 'image' file"}, status_code=400)
+    raw = await upload.read()
+    try:
+        _, image_bytes, mime_type = await run_in_threadpool(
+            image_preprocess.prepare_image, raw
+        )
+    except Exception:
+        return JSONResponse({"error": "not a readable image"}, status_code=400)
+    image_data = {"mime_type": mime_type, "data": image_bytes}
+
+    if _flag(request, "structured", "0"):
+        return await _analyze_structured(request, image_data)
+
+    if _flag(request, "degraded", "0"):
+        text = analysis.get_degraded_image_response(image_data)
+        if text is None:
+            return JSONResponse({"error": "no similar analysis"}, status_code=404)
+        return JSONResponse({"analysis": text, "degraded": True})
+
+    if _flag(request, "stream", "1"):
+        return await _stream_response(
+            analysis.stream_image_response_async(image_data)
+        )
+    try:
+        text = await async_client.call(analysis.get_image_response_async(image_data))
+    except (circuit_breaker.CircuitOpenError, *retry.MODEL_ERRORS) as exc:
+        return _error_response(exc)
+    return JSONResponse({"analysis": text})
+
+
+async def _analyze_structured(request, image_data):
+    # ?structured=1 answers {"report": {...}} (see vehicle_report.py); a
+    # JSON report is only useful whole, so it is never streamed
+    if _flag(request, "degraded", "0"):
+        report = analysis.get_degraded_image_report(image_data)
+        if report is None:
+            return JSONResponse({"error": "no similar analysis"}, status_code=404)
+        return JSONResponse({"report": report.to_dict(), "degraded": True})
+    try:
+        report = await async_client.call(analysis.get_image_report_async(image_data))
+    except (circuit_breaker.CircuitOpenError, *retry.MODEL_ERRORS) as exc:
+        return _error_response(exc)
+    return JSONResponse({"report": report.to_dict()})
+
+
+# ============================================
+# 3️⃣ Chat Endpoint
+# ============================================
+
+async def chat(request):
+    _use_session(request)
+    try:
+        query = (await request.json())["query"].strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JSONResponse({"error": "expected {\"query\": \"...\"}"}, status_code=400)
+    if not query:
+        return JSONResponse({"error": "empty query"}, status_code=400)
+
+    if _flag(request, "degraded", "0"):
+        text = analysis.get_degraded_chat_response(query)
+        if text is None:
+            return JSONResponse({"error": "no similar answer"}, status_code=404)
+        return JSONResponse({"response": text, "degraded": True})
+
+    if _flag(request, "stream", "1"):
+        return await _stream_response(analysis.stream_chat_response_async(query))
+    try:
+        text = await async_client.call(analysis.get_chat_response_async(query))
+    except (circuit_breaker.CircuitOpenError, *retry.MODEL_ERRORS) as exc:
+        return _error_response(exc)
+    return JSONResponse({"response": text})
+
+
+# ============================================
+# 4️⃣ Health And Stats
+# ============================================
+
+async def health(request):
+    return JSONResponse(
+        {
+            "breaker": circuit_breaker.breaker.stats(),
+            "limiter": rate_limit.limiter.stats(),
+            "retry": retry.metrics(),
+            "image_cache": response_cache.image_results.stats(),
+            "chat_cache": response_cache.chat_results.stats(),
+            "warmup": warmup.status,
+        }
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm-up runs here rather than in UI servers that use this service
+    warmup.start(
+        analysis.get_chat_response,
+        lambda query: analysis.get_cached_chat_response(query)[1] is not None,
+        analysis.EXAMPLE_QUERIES,
+    )
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/analyze", analyze, methods=["POST"]),
+        Route("/chat", chat, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv("AUTOSAGE_API_HOST", "127.0.0.1"),
+        port=int(os.getenv("AUTOSAGE_API_PORT", "8000")),
+    )
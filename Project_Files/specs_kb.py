@@ -0,0 +1,267 @@
+# ============================================
+# AutoSage - Local Vehicle Specs Knowledge Base
+# ============================================
+# Launch year, fuel type, engine, mileage, price range, safety features
+# and the like are catalog facts for a finite set of Indian-market models,
+# yet every image analysis asked the model to write them out again. This
+# SQLite store keeps them per brand and model, filled from validated past
+# analyses and from imported datasets:
+#
+#   python specs_kb.py import dataset.parquet
+#   python specs_kb.py stats
+#
+# Once a vehicle is identified, report() returns these fields directly and
+# only the open-ended parts (selling points, audience, summary) still need
+# the model.
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import analysis_parser
+from vehicle_report import VehicleReport
+
+DB_PATH = os.getenv(
+    "AUTOSAGE_SPECS_DB", str(Path(__file__).parent / ".autosage_specs.sqlite3")
+)
+ENABLED = os.getenv("AUTOSAGE_SPECS_KB", "1") == "1"
+# Model answers below this analysis_parser score are not trusted as specs
+MIN_SCORE = float(os.getenv("AUTOSAGE_SPECS_MIN_SCORE", "0.95"))
+
+IMPORTED = "import"
+MODEL = "model"
+
+# Stable per-model facts served from the store
+SPEC_FIELDS = (
+    "launch_year",
+    "vehicle_type",
+    "fuel_type",
+    "engine_capacity",
+    "transmission",
+    "special_features",
+    "mileage",
+    "power_output",
+    "torque",
+    "price_range_inr",
+    "maintenance_level",
+    "safety_features",
+    "maintenance_cost",
+    "resale_value_inr",
+)
+# What the model still writes once the vehicle is known
+OPEN_FIELDS = ("unique_selling_points", "target_audience", "summary")
+_LIST_FIELDS = ("special_features", "safety_features")
+_NUMBERS = (
+    "price_min_inr",
+    "price_max_inr",
+    "mileage_min",
+    "mileage_max",
+    "mileage_unit",
+    "engine_cc",
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS specs (
+    key TEXT PRIMARY KEY,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    {", ".join(f"{name} TEXT" for name in SPEC_FIELDS)},
+    price_min_inr INTEGER,
+    price_max_inr INTEGER,
+    mileage_min REAL,
+    mileage_max REAL,
+    mileage_unit TEXT,
+    engine_cc INTEGER,
+    source TEXT NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 1,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS specs_brand ON specs (brand);
+CREATE INDEX IF NOT EXISTS specs_segment
+    ON specs (vehicle_type, fuel_type, price_min_inr);
+CREATE INDEX IF NOT EXISTS specs_price ON specs (price_min_inr, price_max_inr);
+"""
+
+_COLUMNS = ("key", "brand", "model", *SPEC_FIELDS, *_NUMBERS, "source", "updated")
+# Imported data is curated: model answers never overwrite it
+_UPSERT = f"""
+INSERT INTO specs ({", ".join(_COLUMNS)})
+VALUES ({", ".join("?" for _ in _COLUMNS)})
+ON CONFLICT (key) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in _COLUMNS[1:])},
+    samples = specs.samples + 1
+WHERE specs.source = '{MODEL}' OR excluded.source = '{IMPORTED}'
+"""
+
+_local = threading.local()
+# Bumped on every write, so in-process readers (the catalog) see changes
+# without waiting for a refresh
+_generation = 0
+
+
+# ============================================
+# 1️⃣ SQLite Store
+# ============================================
+
+def _db():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _normalize(name):
+    return re.sub(r"[^0-9a-z]+", "", name.casefold())
+
+
+def make_key(brand, model):
+    """Lookup key; "Tata" + "Tata Nexon" and "TATA" + "nexon" are the same."""
+    brand, model = _normalize(brand), _normalize(model)
+    if brand and model.startswith(brand) and model != brand:
+        model = model[len(brand):]
+    return f"{brand}|{model}"
+
+
+def record(parsed, source=MODEL):
+    """Store a ParsedAnalysis as the specs for its brand and model.
+
+    Returns False (and stores nothing) if it is not complete enough.
+    """
+    global _generation
+    report = parsed.report
+    if not (report.brand and report.model and parsed.price_min_inr is not None):
+        return False
+    values = {name: getattr(report, name) for name in SPEC_FIELDS}
+    for name in _LIST_FIELDS:
+        values[name] = json.dumps(list(values[name]), ensure_ascii=False)
+    values.update((name, getattr(parsed, name)) for name in _NUMBERS)
+    cursor = _db().execute(
+        _UPSERT,
+        (
+            make_key(report.brand, report.model),
+            report.brand,
+            report.model,
+            *(values[name] for name in (*SPEC_FIELDS, *_NUMBERS)),
+            source,
+            time.time(),
+        ),
+    )
+    # An imported row a model answer may not overwrite is left as it was
+    if cursor.rowcount:
+        _generation += 1
+    return True
+
+
+def learn(parsed):
+    """Record a model's answer, if it scored well enough to be trusted."""
+    return parsed.score >= MIN_SCORE and record(parsed)
+
+
+def get(key):
+    """Everything stored for a make_key() key as a dict, or None."""
+    row = _db().execute("SELECT * FROM specs WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    row = dict(row)
+    for name in _LIST_FIELDS:
+        row[name] = tuple(json.loads(row[name] or "[]"))
+    return row
+
+
+def report(key):
+    """A VehicleReport with the stored spec fields, or None if unknown."""
+    row = get(key) if ENABLED else None
+    if row is None:
+        return None
+    return VehicleReport.from_dict(
+        {name: row[name] for name in ("brand", "model", *SPEC_FIELDS)}
+    )
+
+
+def generation():
+    return _generation
+
+
+def version():
+    """Changes whenever another connection, in any process, writes the store.
+
+    Only comparable between calls from the same thread.
+    """
+    return _db().execute("PRAGMA data_version").fetchone()[0]
+
+
+def catalog_rows():
+    """Brand, model, segment, price and mileage of every priced vehicle."""
+    rows = _db().execute(
+        "SELECT key, brand, model, vehicle_type, fuel_type, price_range_inr, mileage,"
+        f" {', '.join(_NUMBERS)} FROM specs WHERE price_min_inr IS NOT NULL"
+    )
+    return [dict(row) for row in rows]
+
+
+def is_empty():
+    return _db().execute("SELECT 1 FROM specs LIMIT 1").fetchone() is None
+
+
+def stats():
+    rows = _db().execute("SELECT source, COUNT(*) FROM specs GROUP BY source")
+    return dict(rows.fetchall())
+
+
+# ============================================
+# 2️⃣ Importing Datasets
+# ============================================
+
+def _report_from_row(row):
+    # Rows as written by analysis_parser or batch_analyze --structured,
+    # where list fields are joined with "; "
+    values = {}
+    for name, value in row.items():
+        if not isinstance(value, str):
+            continue
+        if name in _LIST_FIELDS:
+            value = [part.strip() for part in value.split(";") if part.strip()]
+        values[name] = value
+    return VehicleReport.from_dict(values)
+
+
+def import_rows(rows):
+    """Import dataset rows as curated specs; returns how many were stored."""
+    stored = 0
+    for row in rows:
+        parsed = analysis_parser.normalize_report(_report_from_row(row))
+        stored += record(parsed, source=IMPORTED)
+    return stored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the AutoSage specs store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="import a dataset of specs")
+    importer.add_argument(
+        "source", help=".jsonl, .csv or .parquet, one vehicle per row"
+    )
+    commands.add_parser("stats", help="count stored vehicles by source")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        rows = analysis_parser.read_rows(args.source)
+        print(f"Imported {import_rows(rows)} rows into {DB_PATH}")
+    else:
+        print(json.dumps(stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+# ============================================
+# AutoSage - Typed Vehicle Report
+# ============================================
+# In structured-output mode the model answers with JSON that follows
+# REPORT_SCHEMA (the same sections image_prompt asks for), parsed into a
+# VehicleReport. Caching, tables, comparison and export then work on
+# fields instead of re-parsing markdown; to_markdown() renders the usual
+# layout from the typed data.
+
+import json
+from dataclasses import asdict, dataclass, fields
+
+# Section titles as used in image_prompt, for rendering and tables
+TITLES = {
+    "brand": "Brand",
+    "model": "Model",
+    "launch_year": "Launch Year",
+    "vehicle_type": "Vehicle Type",
+    "fuel_type": "Fuel Type",
+    "engine_capacity": "Engine Capacity",
+    "transmission": "Transmission Type",
+    "special_features": "Top 3 Special Features",
+    "mileage": "Mileage",
+    "power_output": "Power Output",
+    "torque": "Torque",
+    "price_range_inr": "Average Price in INR",
+    "maintenance_level": "Maintenance Level",
+    "safety_features": "Safety Features",
+    "maintenance_cost": "Maintenance cost (approx)",
+    "unique_selling_points": "Unique selling points",
+    "target_audience": "Target audience",
+    "resale_value_inr": "Approximate Resale Value",
+    "summary": "Summary",
+}
+
+
+@dataclass(slots=True)
+class VehicleReport:
+    brand: str = ""
+    model: str = ""
+    launch_year: str = ""
+    vehicle_type: str = ""
+    fuel_type: str = ""
+    engine_capacity: str = ""
+    transmission: str = ""
+    special_features: tuple = ()
+    mileage: str = ""
+    power_output: str = ""
+    torque: str = ""
+    price_range_inr: str = ""
+    maintenance_level: str = ""
+    safety_features: tuple = ()
+    maintenance_cost: str = ""
+    unique_selling_points: str = ""
+    target_audience: str = ""
+    resale_value_inr: str = ""
+    summary: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a report from model output, tolerating missing or extra keys."""
+        values = {}
+        for field in fields(cls):
+            value = data.get(field.name)
+            if value is None:
+                continue
+            if field.type is tuple:
+                if isinstance(value, str):
+                    value = [value]
+                values[field.name] = tuple(str(v).strip() for v in value if v)
+            else:
+                values[field.name] = str(value).strip()
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, text):
+        """Raises ValueError if `text` is not a JSON object."""
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        return cls.from_dict(data)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def is_complete(self):
+        return bool(self.brand and self.model and self.price_range_inr)
+
+    def summary_row(self):
+        """The batch summary columns, keyed like analysis.SUMMARY_FIELDS."""
+        return {
+            TITLES[name]: getattr(self, name)
+            for name in (
+                "brand",
+                "model",
+                "vehicle_type",
+                "fuel_type",
+                "mileage",
+                "price_range_inr",
+            )
+        }
+
+    def to_markdown(self):
+        """The image_prompt layout, rendered from the fields."""
+
+        def line(name):
+            return f"**{TITLES[name]}:** {getattr(self, name) or '—'}"
+
+        def bullets(values):
+            return "\n".join(f"- {value}" for value in values) or "- —"
+
+        def sub(name):
+            return f"- {TITLES[name]}: {getattr(self, name) or '—'}"
+
+        parts = [
+            line("brand"),
+            line("model"),
+            line("launch_year"),
+            line("vehicle_type"),
+            line("fuel_type"),
+            "**Key Features:**\n"
+            + "\n".join([sub("engine_capacity"), sub("transmission")])
+            + f"\n- {TITLES['special_features']}:\n"
+            + "\n".join(f"  - {value}" for value in self.special_features),
+            line("mileage"),
+            "**Performance:**\n" + "\n".join([sub("power_output"), sub("torque")]),
+            line("price_range_inr"),
+            line("maintenance_level"),
+            "**Safety Features:**\n" + bullets(self.safety_features),
+            "**Other Details:**\n"
+            + "\n".join(
+                [
+                    sub("maintenance_cost"),
+                    sub("unique_selling_points"),
+                    sub("target_audience"),
+                ]
+            ),
+            line("resale_value_inr"),
+            self.summary,
+        ]
+        return "\n\n".join(part for part in parts if part)
+
+
+def _schema():
+    properties = {}
+    for field in fields(VehicleReport):
+        if field.type is tuple:
+            properties[field.name] = {"type": "array", "items": {"type": "string"}}
+        else:
+            properties[field.name] = {"type": "string"}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+    }
+
+
+# JSON schema handed to Gemini as response_schema
+REPORT_SCHEMA = _schema()
+
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": REPORT_SCHEMA,
+}
@@ -0,0 +1,70 @@
+# ============================================
+# AutoSage - Chat Cache Warm-Up
+# ============================================
+# The chat panel advertises a handful of example queries, and those are
+# what new users ask first. When enabled, a background thread answers them
+# (plus any configured top queries) once per process so the response
+# cache is already warm. It is rate-limited so it never competes with real
+# users for quota, and it never blocks the app from serving.
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("AUTOSAGE_WARMUP", "0") == "1"
+# Extra queries to warm, separated by ";"
+EXTRA_QUERIES = [
+    q.strip() for q in os.getenv("AUTOSAGE_WARMUP_QUERIES", "").split(";") if q.strip()
+]
+REQUESTS_PER_MINUTE = float(os.getenv("AUTOSAGE_WARMUP_RPM", "6"))
+
+_started = False
+_lock = threading.Lock()
+status = {"done": 0, "skipped": 0, "failed": 0, "total": 0}
+
+
+def _run(answer_fn, is_cached_fn, queries, interval):
+    for i, query in enumerate(queries):
+        if is_cached_fn(query):
+            status["skipped"] += 1
+            continue
+        started = time.monotonic()
+        try:
+            answer_fn(query)
+            status["done"] += 1
+        except Exception:
+            status["failed"] += 1
+            logger.exception("Warm-up query failed: %r", query)
+        if i < len(queries) - 1:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    logger.info("Cache warm-up finished: %s", status)
+
+
+def start(answer_fn, is_cached_fn, queries):
+    """Warm the cache in a daemon thread; only the first call per process runs.
+
+    answer_fn(query) computes and caches an answer; is_cached_fn(query)
+    reports whether one is already cached.
+    """
+    global _started
+    if not ENABLED:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+
+    # Keep order, drop duplicates
+    queries = list(dict.fromkeys([*queries, *EXTRA_QUERIES]))
+    status["total"] = len(queries)
+    interval = 60.0 / REQUESTS_PER_MINUTE if REQUESTS_PER_MINUTE > 0 else 0.0
+    threading.Thread(
+        target=_run,
+        args=(answer_fn, is_cached_fn, queries, interval),
+        name="autosage-warmup",
+        daemon=True,
+    ).start()
+    return True